@@ -1,3 +1,144 @@
+import json
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Project, Task
+from webtask.pagination import encode_cursor
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.stranger = User.objects.create_user('stranger')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        cls.task = Task.objects.create(
+            project=cls.project, title='Shared', assigned_to=cls.assignee)
+        cls.private = Task.objects.create(project=cls.project, title='Owner')
+
+    def url(self, name, **kwargs):
+        if name != 'projects':
+            kwargs.setdefault('project_id', self.project.pk)
+        return reverse(f'api:{name}', kwargs=kwargs)
+
+    def send(self, method, url, payload):
+        return getattr(self.client, method)(
+            url, json.dumps(payload), content_type='application/json')
+
+
+class ReadTests(ApiTestCase):
+    def test_requires_login(self):
+        self.assertEqual(self.client.get(self.url('projects')).status_code, 401)
+
+    def test_visibility(self):
+        self.client.force_login(self.stranger)
+        self.assertEqual(
+            self.client.get(self.url('projects')).json()['results'], [])
+        self.assertEqual(self.client.get(self.url('tasks')).status_code, 404)
+        self.client.force_login(self.assignee)
+        results = self.client.get(self.url('tasks')).json()['results']
+        self.assertEqual([task['id'] for task in results], [self.task.pk])
+
+    def test_sparse_fields_and_cursor(self):
+        Task.objects.bulk_create(
+            Task(project=self.project, title=f'T{i}') for i in range(5))
+        self.client.force_login(self.owner)
+        seen, cursor = [], ''
+        while True:
+            data = self.client.get(self.url('tasks'), {
+                'fields': 'id,title', 'limit': 3, 'cursor': cursor}).json()
+            self.assertTrue(all(set(row) == {'id', 'title'}
+                                for row in data['results']))
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 7)
+        response = self.client.get(self.url('tasks'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url('tasks'), {
+            'cursor': encode_cursor(['2024-01-01T00:00:00+00:00', 'abc'])})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkWriteTests(ApiTestCase):
+    def create(self, count):
+        return self.send('post', self.url('tasks'), {'tasks': [
+            {'title': f'New {i}', 'assigned_to': self.assignee.pk,
+             'status': 'in_progress'} for i in range(count)]})
+
+    def test_bulk_create_constant_queries(self):
+        self.client.force_login(self.owner)
+        counts = []
+        for size in (2, 40):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.create(size)
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.in_progress_count, 42)
+
+    def test_bulk_create_validation_is_all_or_nothing(self):
+        self.client.force_login(self.owner)
+        response = self.send('post', self.url('tasks'), [
+            {'title': 'ok'}, {'title': ''}, {'title': 'x', 'assigned_to': 0}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'1', '2'})
+        self.assertEqual(self.project.tasks.count(), 2)
+
+    def test_assignee_must_be_an_active_user_id(self):
+        self.client.force_login(self.owner)
+        response = self.send('post', self.url('tasks'), [
+            {'title': 'x', 'assigned_to': True}])
+        self.assertEqual(response.status_code, 400)
+        inactive = User.objects.create_user('gone', is_active=False)
+        response = self.send('post', self.url('tasks'), [
+            {'title': 'x', 'assigned_to': inactive.pk}])
+        self.assertEqual(response.json()['errors'],
+                         {'0': {'assigned_to': ['Unknown user.']}})
+        self.assertEqual(self.project.tasks.count(), 2)
+
+    def test_only_owner_writes(self):
+        self.client.force_login(self.assignee)
+        self.assertEqual(self.create(1).status_code, 403)
+
+    def test_bulk_update(self):
+        self.client.force_login(self.owner)
+        response = self.send('patch', self.url('tasks'), [
+            {'id': self.task.pk, 'status': 'completed'},
+            {'id': self.private.pk, 'title': 'Renamed', 'assigned_to': None},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.task.refresh_from_db()
+        self.private.refresh_from_db()
+        self.assertEqual(self.task.status, 'completed')
+        self.assertEqual(self.task.assigned_to, self.assignee)
+        self.assertEqual(self.private.title, 'Renamed')
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.project.pending_count, self.project.completed_count), (1, 1))
+
+    def test_ids_must_be_integers(self):
+        self.client.force_login(self.owner)
+        for body in ([{'id': [self.task.pk], 'title': 'x'}],
+                     [{'id': True, 'title': 'x'}], [{'title': 'x'}]):
+            with self.subTest(body=body):
+                self.assertEqual(self.send(
+                    'patch', self.url('tasks'), body).status_code, 400)
+        response = self.send('post', self.url('task_status'), {
+            'ids': [True], 'status': 'completed'})
+        self.assertEqual(response.status_code, 400)
 
-# Create your tests here.
+    def test_status_change_respects_assignment(self):
+        self.client.force_login(self.assignee)
+        response = self.send('post', self.url('task_status'), {
+            'ids': [self.task.pk, self.private.pk], 'status': 'completed'})
+        self.assertEqual(response.json(), {'changed': [self.task.pk]})
+        self.private.refresh_from_db()
+        self.assertEqual(self.private.status, 'pending')
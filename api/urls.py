@@ -0,0 +1,16 @@
+"""API Urls."""
+from django.urls import path
+from api import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('projects/',
+         views.ProjectListView.as_view(), name='projects'),
+    path('projects/<int:project_id>/',
+         views.ProjectDetailView.as_view(), name='project'),
+    path('projects/<int:project_id>/tasks/',
+         views.TaskListView.as_view(), name='tasks'),
+    path('projects/<int:project_id>/tasks/status/',
+         views.TaskStatusView.as_view(), name='task_status'),
+]
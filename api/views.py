@@ -1,3 +1,290 @@
-from django.shortcuts import render
+"""JSON API for projects and tasks.
 
-# Create your views here.
+Authentication is the regular session (plus CSRF token for writes) and the
+visibility rules are the ones of ``webtask.views``: a project is visible to
+its owner and to users with a task assigned in it, only the owner creates
+or edits tasks, and the owner or the assignee changes a task's status.
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+
+from core.history import history_state
+from core.models import Project, Task, TaskEvent
+from core.realtime import task_delta
+from core.signals import tasks_changed
+from webtask.forms import TaskDataForm
+from webtask.pagination import InvalidCursor, paginate_keyset
+
+MAX_PAGE_SIZE = 200
+MAX_BULK_SIZE = 1000
+
+# Public field name -> model attribute.
+PROJECT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'owner': 'owner_id',
+    'pending_count': 'pending_count',
+    'in_progress_count': 'in_progress_count',
+    'completed_count': 'completed_count',
+    'overdue_count': 'overdue_count',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+TASK_FIELDS = {
+    'id': 'id',
+    'project': 'project_id',
+    'title': 'title',
+    'description': 'description',
+    'due_date': 'due_date',
+    'status': 'status',
+    'assigned_to': 'assigned_to_id',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+TASK_WRITABLE_FIELDS = ('title', 'description', 'due_date', 'status',
+                        'assigned_to')
+
+
+class ApiError(Exception):
+    """Turned into a JSON error response by ``ApiView``."""
+
+    def __init__(self, status, error, **extra):
+        super().__init__(error)
+        self.status = status
+        self.payload = {'error': error, **extra}
+
+
+class ApiView(View):
+    """Base view: session authentication and JSON error handling."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'error': 'Authentication required.'}, status=401)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse(exc.payload, status=exc.status)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        raise ApiError(405, f'Method {request.method} not allowed.')
+
+    def json_body(self):
+        try:
+            return json.loads(self.request.body or b'null')
+        except ValueError:
+            raise ApiError(400, 'Invalid JSON body.')
+
+    def selected_fields(self, available):
+        """Columns requested through ``?fields=a,b`` (all by default)."""
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(available)
+        names = [name.strip() for name in requested.split(',') if name]
+        unknown = sorted(set(names) - set(available))
+        if unknown:
+            raise ApiError(400, 'Unknown fields.', fields=unknown)
+        return names
+
+    def page_size(self):
+        try:
+            size = int(self.request.GET.get('limit', 50))
+        except ValueError:
+            raise ApiError(400, 'limit must be an integer.')
+        return max(1, min(size, MAX_PAGE_SIZE))
+
+    def paginated(self, queryset, available, ordering):
+        """One keyset page of ``queryset`` with only the selected fields."""
+        names = self.selected_fields(available)
+        columns = {available[name] for name in names} | set(ordering)
+        try:
+            page = paginate_keyset(
+                queryset.values(*columns), self.request.GET.get('cursor'),
+                self.page_size(), ordering)
+        except InvalidCursor:
+            raise ApiError(400, 'Invalid cursor.')
+        results = [
+            {name: row[available[name]] for name in names} for row in page
+        ]
+        return JsonResponse(
+            {'results': results, 'next_cursor': page.next_cursor})
+
+    def get_project(self, owner_only=False):
+        projects = Project.objects.visible_to(self.request.user)
+        project = projects.filter(pk=self.kwargs['project_id']).first()
+        if project is None:
+            raise ApiError(404, 'Project not found.')
+        if owner_only and project.owner_id != self.request.user.pk:
+            raise ApiError(403, 'Only the project owner can do this.')
+        return project
+
+
+def is_id(value):
+    """Whether ``value`` is usable as a primary key (bools are not)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def serialize_task(task):
+    return {
+        name: getattr(task, attribute)
+        for name, attribute in TASK_FIELDS.items()
+    }
+
+
+class ProjectListView(ApiView):
+    def get(self, request):
+        return self.paginated(
+            Project.objects.visible_to(request.user), PROJECT_FIELDS,
+            ('id',))
+
+
+class ProjectDetailView(ApiView):
+    def get(self, request, project_id):
+        project = self.get_project()
+        return JsonResponse({
+            name: getattr(project, PROJECT_FIELDS[name])
+            for name in self.selected_fields(PROJECT_FIELDS)
+        })
+
+
+class TaskListView(ApiView):
+    """List, bulk-create (POST) and bulk-update (PATCH) project tasks."""
+
+    def get(self, request, project_id):
+        project = self.get_project()
+        tasks = Task.objects.visible_to(request.user).filter(project=project)
+        status = request.GET.get('status')
+        if status:
+            if status not in Task.TaskStatus.values:
+                raise ApiError(400, 'Unknown status.')
+            tasks = tasks.filter(status=status)
+        return self.paginated(tasks, TASK_FIELDS, ('created_at', 'id'))
+
+    def items(self, key='tasks'):
+        body = self.json_body()
+        items = body.get(key) if isinstance(body, dict) else body
+        if not isinstance(items, list) or not all(
+                isinstance(item, dict) for item in items):
+            raise ApiError(400, f'Expected a list of objects in "{key}".')
+        if len(items) > MAX_BULK_SIZE:
+            raise ApiError(
+                400, f'At most {MAX_BULK_SIZE} items per request.')
+        return items
+
+    def assignees(self, rows):
+        """Map assignee ids used by ``rows`` to active users, in one query."""
+        ids = set()
+        for row in rows:
+            value = row.get('assigned_to')
+            if value is not None:
+                if not is_id(value):
+                    raise ApiError(400, 'assigned_to must be a user id.')
+                ids.add(value)
+        # Like TaskForm, only active users can be assigned.
+        return User.objects.filter(is_active=True).in_bulk(ids)
+
+    def validate(self, items, instances=None):
+        """Run ``TaskDataForm`` over every item; raise with all errors."""
+        instances = instances or [None] * len(items)
+        rows = []
+        for item, instance in zip(items, instances):
+            data = model_to_dict(instance) if instance else {
+                'description': '', 'status': Task.TaskStatus.PENDING}
+            data.update(item)
+            rows.append(data)
+        users = self.assignees(rows)
+        tasks, errors = [], {}
+        for index, (data, instance) in enumerate(zip(rows, instances)):
+            form = TaskDataForm(data, instance=instance)
+            item_errors = {
+                field: list(messages)
+                for field, messages in form.errors.items()
+            }
+            assignee = data.get('assigned_to')
+            if assignee is not None and assignee not in users:
+                item_errors['assigned_to'] = ['Unknown user.']
+            if item_errors:
+                errors[index] = item_errors
+                continue
+            task = form.save(commit=False)
+            task.assigned_to = users.get(assignee)
+            tasks.append(task)
+        if errors:
+            raise ApiError(400, 'Validation failed.', errors=errors)
+        return tasks
+
+    def post(self, request, project_id):
+        project = self.get_project(owner_only=True)
+        tasks = self.validate(self.items())
+        for task in tasks:
+            task.project = project
+        Task.objects.bulk_create(tasks)
+        return JsonResponse(
+            {'results': [serialize_task(task) for task in tasks]},
+            status=201)
+
+    def patch(self, request, project_id):
+        project = self.get_project(owner_only=True)
+        items = self.items()
+        ids = [item.get('id') for item in items]
+        if not all(is_id(pk) for pk in ids):
+            raise ApiError(400, 'Every item needs an integer "id".')
+        with transaction.atomic():
+            existing = Task.objects.select_for_update(of=('self',)).filter(
+                project=project).in_bulk(ids)
+            missing = [pk for pk in ids if pk not in existing]
+            if missing:
+                raise ApiError(404, 'Tasks not found.', ids=missing)
+            if len(set(ids)) != len(ids):
+                raise ApiError(400, 'Duplicated task ids.')
+            instances = [existing[pk] for pk in ids]
+            before = [task.tracked_state() for task in instances]
+            history = [history_state(task) for task in instances]
+            tasks = self.validate(
+                [{key: value for key, value in item.items() if key != 'id'}
+                 for item in items], instances)
+            now = timezone.now()
+            for task in tasks:
+                task.updated_at = now
+            Task.objects.bulk_update(
+                tasks, TASK_WRITABLE_FIELDS + ('updated_at',))
+            Project.all_objects.apply_task_changes(
+                zip(before, (task.tracked_state() for task in tasks)))
+            events = (
+                TaskEvent.for_change(
+                    task.pk, task.project_id, state, history_state(task))
+                for task, state in zip(tasks, history))
+            TaskEvent.objects.bulk_create(
+                event for event in events if event is not None)
+            tasks_changed.send(
+                sender=Task, project_ids=[project.pk],
+                deltas=[task_delta(task) for task in tasks])
+        return JsonResponse(
+            {'results': [serialize_task(task) for task in tasks]})
+
+
+class TaskStatusView(ApiView):
+    """Set the status of many tasks: ``{"ids": [...], "status": "..."}``."""
+
+    def post(self, request, project_id):
+        project = self.get_project()
+        body = self.json_body()
+        if not isinstance(body, dict):
+            raise ApiError(400, 'Expected an object.')
+        status, ids = body.get('status'), body.get('ids')
+        if status not in Task.TaskStatus.values:
+            raise ApiError(400, 'Unknown status.')
+        if not isinstance(ids, list) or not all(is_id(pk) for pk in ids):
+            raise ApiError(400, 'ids must be a list of task ids.')
+        if len(ids) > MAX_BULK_SIZE:
+            raise ApiError(400, f'At most {MAX_BULK_SIZE} items per request.')
+        changed = Task.objects.filter(project=project).change_status(
+            request.user, status, ids)
+        return JsonResponse({'changed': changed})
@@ -1,18 +1,36 @@
 from django.contrib import admin
 from .models import Project, Task
+from .search import search
 
 # Register your models here.
 
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('name', 'owner', 'created_at')
+    list_display = ('name', 'owner', 'pending_count', 'in_progress_count',
+                    'completed_count', 'overdue_count', 'created_at',
+                    'deleted_at')
     search_fields = ('name', 'description', 'owner__username')
 
+    def get_queryset(self, request):
+        # Projects in the trash are listed too.
+        queryset = Project.all_objects.all()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'project', 'assigned_to',
                     'status', 'due_date', 'created_at')
-    list_filter = ('status', 'assigned_to', 'project')
+    list_filter = ('status', 'project')
+    autocomplete_fields = ('assigned_to', 'project')
     search_fields = ('title', 'description')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of ILIKE over the whole table.
+        if not search_term.strip():
+            return queryset, False
+        return search(queryset, search_term), False
@@ -0,0 +1,51 @@
+"""Per-project generation counters.
+
+Every write to a project or to one of its tasks bumps the project's
+generation, so anything cached under a key that includes the generation is
+invalidated precisely, without scanning or deleting keys. Generations live
+in the default cache and start from a timestamp, so a counter that gets
+evicted never comes back with a value that was already used.
+
+With read replicas, a write also marks its projects as recently written
+for ``REPLICA_PIN_SECONDS``, the time replication is allowed to lag: a
+page read from a replica in that window may predate the new generation.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY = 'project-generation:%s'
+WRITTEN_KEY = 'project-written:%s'
+
+
+def get_generations(project_ids):
+    """Current generation of each project, keyed by project id."""
+    keys = {KEY % project_id: project_id for project_id in project_ids}
+    found = cache.get_many(keys)
+    generations = {keys[key]: value for key, value in found.items()}
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(
+            (keys[key], value) for key, value in missing.items())
+    return generations
+
+
+def bump_generations(project_ids):
+    project_ids = set(project_ids)
+    for project_id in project_ids:
+        try:
+            cache.incr(KEY % project_id)
+        except ValueError:
+            cache.set(KEY % project_id, time.time_ns(), timeout=None)
+    if settings.DATABASE_REPLICAS:
+        cache.set_many(
+            {WRITTEN_KEY % project_id: True for project_id in project_ids},
+            timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def recently_written(project_ids):
+    """Whether any of the projects was written in the replica lag window."""
+    return bool(cache.get_many(
+        [WRITTEN_KEY % project_id for project_id in project_ids]))
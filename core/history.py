@@ -0,0 +1,62 @@
+"""Helpers of the append-only task event log (``core.models.TaskEvent``).
+
+Every write path of ``Task`` (``save``, ``delete``, ``bulk_create``,
+``change_status``, ``QuerySet.delete`` and the API's bulk update) appends
+its events in the same transaction as the change. An event stores a small
+integer kind and a JSON diff ``{field: [old, new]}`` of only the fields in
+``HISTORY_FIELDS`` that changed; the description is left out to keep rows
+small.
+
+The user behind a change is taken from ``acting_as()``, which
+``webtask.middleware.ActorMiddleware`` enters for every request.
+"""
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+HISTORY_FIELDS = ('title', 'status', 'due_date', 'assigned_to_id',
+                  'project_id')
+
+_actor = ContextVar('task_event_actor', default=None)
+
+
+@contextmanager
+def acting_as(user):
+    """Attribute the task events written in this block to ``user``."""
+    # asgiref compares context values when it restores a context, which
+    # would evaluate a lazy request.user; a closure compares by identity.
+    token = _actor.set(lambda: user)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def current_actor_id():
+    actor = _actor.get()
+    user = actor() if actor is not None else None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def history_state(task, fields=HISTORY_FIELDS):
+    """Loaded values of ``fields``; deferred ones are left out."""
+    deferred = task.get_deferred_fields()
+    return {field: getattr(task, field) for field in fields
+            if field not in deferred}
+
+
+def _json(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def diff_states(before, after):
+    """``{field: [old, new]}`` for the fields known on both sides."""
+    return {
+        field: [_json(before[field]), _json(value)]
+        for field, value in after.items()
+        if field in before and before[field] != value
+    }
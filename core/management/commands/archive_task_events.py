@@ -0,0 +1,45 @@
+"""Move old task events to the archive table, in batches.
+
+``TaskEvent`` only ever grows; moving the events older than ``--days`` to
+``TaskEventArchive`` (same columns and ids) keeps the live log and its
+indexes small, so appending to it stays cheap next to the task writes it
+belongs to. Each batch, oldest first, is copied and deleted in one
+transaction, so the command can be interrupted and rerun at any time.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import TaskEvent, TaskEventArchive
+
+FIELDS = ('id', 'task_id', 'project_id', 'actor_id', 'kind', 'diff',
+          'created_at')
+
+
+class Command(BaseCommand):
+    help = 'Archive task events older than --days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=180)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        events = TaskEvent.objects.filter(
+            created_at__lt=cutoff).order_by('created_at', 'id')
+        moved = 0
+        while True:
+            with transaction.atomic():
+                batch = list(events.values(*FIELDS)[:options['batch_size']])
+                if not batch:
+                    break
+                TaskEventArchive.objects.bulk_create(
+                    [TaskEventArchive(**row) for row in batch],
+                    ignore_conflicts=True)
+                TaskEvent.objects.filter(
+                    pk__in=[row['id'] for row in batch]).delete()
+            moved += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} task event(s).'))
@@ -0,0 +1,28 @@
+"""Delete the projects that have been in the trash too long.
+
+Deleting a project only moves it to the trash (``Project.deleted_at``);
+after ``PROJECT_UNDO_DAYS`` it can no longer be restored and is purged here
+together with its tasks, in chunks of ``--batch-size`` tasks with raw
+``DELETE``s (see ``ProjectQuerySet.purge``). ``run_scheduler`` does the
+same on every pass; this command is for cron or for a first large cleanup,
+where ``--sleep`` gives the database room between chunks.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Purge the projects past the undo window, tasks in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        purged = Project.all_objects.purgeable().purge(
+            batch_size=options['batch_size'], sleep=options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {len(purged)} project(s).'))
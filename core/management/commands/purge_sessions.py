@@ -0,0 +1,47 @@
+"""Delete expired sessions in small batches.
+
+``clearsessions`` removes every expired row of ``django_session`` with one
+``DELETE``, which on a large table holds its locks for as long as that
+takes. This command deletes at most ``--batch-size`` rows per statement,
+each in its own transaction, so logins keep going while it runs. Run it
+from cron when ``SESSION_MODE`` is ``db`` or ``cached_db``; the other
+engines expire sessions on their own and are passed to the engine's
+``clear_expired()``.
+"""
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired database sessions in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            store.clear_expired()
+            self.stdout.write('Sessions are not stored in the database.')
+            return
+        sessions = store.get_model_class().objects.filter(
+            expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            keys = list(sessions.values_list(
+                'pk', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            sessions.filter(pk__in=keys).delete()
+            deleted += len(keys)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired session(s).'))
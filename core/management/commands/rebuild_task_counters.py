@@ -0,0 +1,36 @@
+"""Rebuild or verify the denormalized task counters of every project."""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Project
+
+
+class Command(BaseCommand):
+    help = ('Recount pending/in_progress/completed/overdue tasks per project '
+            'and fix the stored counters.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report projects with wrong counters; exit 1 if any.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Projects recounted per query and transaction.')
+        parser.add_argument(
+            '--project', type=int, action='append', dest='projects',
+            help='Limit to this project id (repeatable).')
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options['projects']:
+            projects = projects.filter(pk__in=options['projects'])
+        stale = projects.rebuild_task_counters(
+            batch_size=options['batch_size'], commit=not options['verify'])
+        if options['verify']:
+            if stale:
+                raise CommandError(
+                    f'{len(stale)} project(s) with wrong counters: '
+                    + ', '.join(map(str, stale[:50])))
+            self.stdout.write(self.style.SUCCESS('All counters are correct.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed counters of {len(stale)} project(s).'))
@@ -0,0 +1,43 @@
+"""Run the periodic jobs: due date reminders (see core.reminders) and
+the purge of projects past their undo window (see purge_projects).
+
+Loops every ``--interval`` seconds until interrupted; ``--once`` runs a
+single pass, e.g. from cron. A failed pass is logged and retried on the
+next tick, since the reminder marks only move after a successful one.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.models import Project
+from core.reminders import run_reminders
+
+logger = logging.getLogger('core.scheduler')
+
+
+class Command(BaseCommand):
+    help = 'Send due date reminders and purge old projects periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=300)
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        while True:
+            # Long-running loop: drop connections the server has closed.
+            close_old_connections()
+            try:
+                digests = run_reminders()
+                purged = Project.all_objects.purgeable().purge()
+            except Exception:
+                if options['once']:
+                    raise
+                logger.exception('Scheduler run failed')
+            else:
+                self.stdout.write(f'Sent {len(digests)} reminder digest(s).')
+                self.stdout.write(f'Purged {len(purged)} project(s).')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
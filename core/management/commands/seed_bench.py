@@ -0,0 +1,131 @@
+"""Fill the database with synthetic users, projects and tasks for benchmarks.
+
+Sizes follow a Zipf-like skew: a handful of huge projects hold most of the
+tasks while the long tail has only a few each, and a few users own most of
+the projects. Everything is written with bulk inserts in one transaction::
+
+    python manage.py seed_bench --users 500 --projects 2000 --tasks 200000
+
+The generated users are named ``<prefix>-00000``, ``<prefix>-00001``, ...
+and share the password ``--password``; ``--flush`` removes the previous
+run's users (and with them their projects and tasks) first.
+"""
+import datetime
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Project, Task
+
+WORDS = (
+    'informe', 'cliente', 'revisar', 'diseño', 'factura', 'reunión',
+    'servidor', 'migración', 'pruebas', 'contrato', 'presupuesto', 'web',
+    'móvil', 'soporte', 'despliegue', 'datos', 'seguridad', 'entrega',
+)
+# (status, weight) of the generated tasks.
+STATUSES = (('pending', 40), ('in_progress', 25), ('completed', 35))
+
+
+def zipf_weights(n, exponent):
+    return [1 / (rank + 1) ** exponent for rank in range(n)]
+
+
+class Command(BaseCommand):
+    help = 'Generate skewed synthetic data for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--projects', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=50000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent of project sizes (0 spreads tasks evenly).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--flush', action='store_true')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix'] + '-'
+        if options['users'] < 1 or options['projects'] < 1:
+            raise CommandError('Need at least one user and one project.')
+        start = time.perf_counter()
+        with transaction.atomic():
+            existing = User.objects.filter(username__startswith=prefix)
+            if options['flush']:
+                existing.delete()
+            elif existing.exists():
+                raise CommandError(
+                    f'Users named {prefix}* already exist; pass --flush.')
+            users = self.create_users(prefix, options)
+            projects = self.create_projects(rng, users, options)
+            sizes = self.create_tasks(rng, users, projects, options)
+        elapsed = time.perf_counter() - start
+        sizes = sorted(sizes.values(), reverse=True) or [0]
+        self.stdout.write(
+            f'{len(users)} users, {len(projects)} projects, '
+            f'{options["tasks"]} tasks in {elapsed:.1f}s. Tasks per project: '
+            f'max {sizes[0]}, median {statistics.median(sizes):g}, '
+            f'top 1% hold {sum(sizes[:max(1, len(sizes) // 100)])}.')
+
+    def create_users(self, prefix, options):
+        # Hashing is slow on purpose, so every user shares one hash.
+        password = make_password(options['password'])
+        return User.objects.bulk_create(
+            User(username=f'{prefix}{i:05d}',
+                 email=f'{prefix}{i:05d}@example.com', password=password)
+            for i in range(options['users']))
+
+    def create_projects(self, rng, users, options):
+        owners = rng.choices(
+            users, zipf_weights(len(users), 1.0), k=options['projects'])
+        return Project.objects.bulk_create(
+            (Project(owner=owner, name=self.words(rng, 2).capitalize(),
+                     description=self.words(rng, 12))
+             for owner in owners), batch_size=options['batch_size'])
+
+    def create_tasks(self, rng, users, projects, options):
+        today = timezone.localdate()
+        weights = zipf_weights(len(projects), options['skew'])
+        # Each project has a small team its tasks are assigned to.
+        teams = {
+            project.pk: rng.sample(users, min(len(users), rng.randint(1, 8)))
+            for project in projects
+        }
+        statuses, status_weights = zip(*STATUSES)
+        sizes = Counter()
+        remaining = options['tasks']
+        while remaining:
+            batch = []
+            for project in rng.choices(
+                    projects, weights,
+                    k=min(remaining, options['batch_size'])):
+                sizes[project.pk] += 1
+                due_date = None
+                if rng.random() < 0.7:
+                    due_date = today + datetime.timedelta(
+                        days=rng.randint(-60, 90))
+                batch.append(Task(
+                    project=project,
+                    title=self.words(rng, 4).capitalize(),
+                    description=self.words(rng, 20),
+                    due_date=due_date,
+                    status=rng.choices(statuses, status_weights)[0],
+                    assigned_to=(rng.choice(teams[project.pk])
+                                 if rng.random() < 0.8 else None),
+                ))
+            Task.objects.bulk_create(batch)
+            remaining -= len(batch)
+        return sizes
+
+    def words(self, rng, count):
+        return ' '.join(rng.choices(WORDS, k=count))
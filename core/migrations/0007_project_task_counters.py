@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:05
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def fill_task_counters(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+    today = timezone.localdate()
+    rows = Task.objects.values('project_id').annotate(
+        pending_count=Count('pk', filter=Q(status='pending')),
+        in_progress_count=Count('pk', filter=Q(status='in_progress')),
+        completed_count=Count('pk', filter=Q(status='completed')),
+        overdue_count=Count('pk', filter=Q(due_date__lt=today) & ~Q(
+            status='completed')),
+    ).order_by()
+    for row in rows:
+        Project.objects.filter(pk=row.pop('project_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_task_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='overdue_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Full-text search index of tasks and projects (see core.search).
+#
+# PostgreSQL: a stored generated tsvector column plus a GIN index, so the
+# database keeps it current on every write. SQLite: an external-content
+# FTS5 table per model kept in sync by triggers. Migrations that rebuild
+# core_task or core_project on SQLite drop those triggers and must run
+# SQLITE_FORWARDS for that table again.
+
+from django.db import migrations
+
+# (table, weight-A column, weight-B column)
+TABLES = [
+    ('core_task', 'title', 'description'),
+    ('core_project', 'name', 'description'),
+]
+
+POSTGRES_FORWARDS = [
+    """ALTER TABLE {table} ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce({a}, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce({b}, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX {table}_search_idx ON {table} USING GIN (search_vector)',
+]
+
+POSTGRES_BACKWARDS = [
+    'DROP INDEX IF EXISTS {table}_search_idx',
+    'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FORWARDS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+        {a}, {b}, content='{table}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table}
+    BEGIN
+        INSERT INTO {table}_fts(rowid, {a}, {b})
+        VALUES (new.id, new.{a}, new.{b});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table}
+    BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, {a}, {b})
+        VALUES ('delete', old.id, old.{a}, old.{b});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_au
+    AFTER UPDATE OF {a}, {b} ON {table}
+    BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, {a}, {b})
+        VALUES ('delete', old.id, old.{a}, old.{b});
+        INSERT INTO {table}_fts(rowid, {a}, {b})
+        VALUES (new.id, new.{a}, new.{b});
+    END""",
+    "INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS {table}_fts_ai',
+    'DROP TRIGGER IF EXISTS {table}_fts_ad',
+    'DROP TRIGGER IF EXISTS {table}_fts_au',
+    'DROP TABLE IF EXISTS {table}_fts',
+]
+
+
+def run(schema_editor, postgres, sqlite):
+    statements = {'postgresql': postgres, 'sqlite': sqlite}.get(
+        schema_editor.connection.vendor, [])
+    for table, a, b in TABLES:
+        for statement in statements:
+            schema_editor.execute(statement.format(table=table, a=a, b=b))
+
+
+def forwards(apps, schema_editor):
+    run(schema_editor, POSTGRES_FORWARDS, SQLITE_FORWARDS)
+
+
+def backwards(apps, schema_editor):
+    run(schema_editor, POSTGRES_BACKWARDS, SQLITE_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_project_task_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
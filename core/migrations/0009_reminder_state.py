@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overdue_through', models.DateField()),
+                ('due_soon_through', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
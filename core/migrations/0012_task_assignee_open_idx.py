@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_project_trash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['assigned_to', 'created_at', 'id'], name='task_assignee_open_idx'),
+        ),
+    ]
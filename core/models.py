@@ -1,5 +1,340 @@
-from django.db import models
+import datetime
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.history import HISTORY_FIELDS, current_actor_id, diff_states
+from core.history import history_state
+from core.realtime import task_delta
+from core.signals import tasks_changed
+
+
+# Counter column of Project that each task status contributes to.
+STATUS_COUNTERS = {
+    'pending': 'pending_count',
+    'in_progress': 'in_progress_count',
+    'completed': 'completed_count',
+}
+TASK_COUNTERS = tuple(STATUS_COUNTERS.values()) + ('overdue_count',)
+
+
+def task_counters(state, today=None):
+    """Counter columns a task in ``state`` adds one to.
+
+    ``state`` is a mapping holding at least ``status`` and ``due_date``.
+    """
+    today = today or timezone.localdate()
+    counters = [STATUS_COUNTERS[state['status']]]
+    if (state['due_date'] is not None and state['due_date'] < today
+            and state['status'] != 'completed'):
+        counters.append('overdue_count')
+    return counters
+
+
+def due_buckets(today=None):
+    """Conditions of the open tasks overdue, due today and due later this
+    week (through Sunday), by bucket name."""
+    today = today or timezone.localdate()
+    end_of_week = today + datetime.timedelta(days=6 - today.weekday())
+    open_tasks = ~models.Q(status='completed')
+    return {
+        'overdue': open_tasks & models.Q(due_date__lt=today),
+        'today': open_tasks & models.Q(due_date=today),
+        'week': open_tasks & models.Q(
+            due_date__gt=today, due_date__lte=end_of_week),
+    }
+
+
+def purge_cutoff():
+    """Projects deleted before this are past the undo window."""
+    return timezone.now() - datetime.timedelta(days=settings.PROJECT_UNDO_DAYS)
+
+
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Projects owned by ``user`` or with a task assigned to them.
+
+        Built as ``pk IN (owned UNION assigned)`` so that both halves are
+        index lookups and no task rows have to be de-duplicated.
+        """
+        owned = Project.objects.filter(owner=user).values('pk')
+        assigned = Task.objects.filter(
+            assigned_to=user).values('project_id')
+        return self.filter(pk__in=owned.union(assigned))
+
+    def apply_task_changes(self, changes):
+        """Move the task counters for a batch of task writes.
+
+        ``changes`` is an iterable of ``(before, after)`` task states; a
+        ``None`` state stands for a task that did not exist. One ``UPDATE``
+        is issued per distinct set of counter changes.
+
+        A task that became overdue since the last recount (see Project) may
+        not be in ``overdue_count`` yet, so decrementing it is not enough:
+        the projects of such before states are recounted instead.
+        """
+        today = timezone.localdate()
+        deltas = defaultdict(Counter)
+        recount = set()
+        recounted_through = None
+        for before, after in changes:
+            if before is not None:
+                fields = task_counters(before, today)
+                if 'overdue_count' in fields:
+                    if recounted_through is None:
+                        recounted_through = self._recounted_through()
+                    if before['due_date'] > recounted_through:
+                        recount.add(before['project_id'])
+                for field in fields:
+                    deltas[before['project_id']][field] -= 1
+            if after is not None:
+                for field in task_counters(after, today):
+                    deltas[after['project_id']][field] += 1
+        for project_id in recount:
+            del deltas[project_id]
+        # Projects whose counters move by the same amounts share an UPDATE,
+        # so a batch spread over many projects needs only a few statements.
+        groups = defaultdict(list)
+        for project_id, delta in deltas.items():
+            key = frozenset((field, value) for field, value in delta.items()
+                            if value)
+            if key:
+                groups[key].append(project_id)
+        for key, project_ids in groups.items():
+            updates = {field: models.F(field) + value for field, value in key}
+            for start in range(0, len(project_ids), 500):
+                self.filter(
+                    pk__in=project_ids[start:start + 500]).update(**updates)
+        if recount:
+            self.model.all_objects.db_manager(self.db).filter(
+                pk__in=recount).rebuild_task_counters()
+
+    def _recounted_through(self):
+        """Due date up to which overdue tasks are in ``overdue_count``."""
+        state = ReminderState.objects.using(self.db).first()
+        return state.overdue_through if state else datetime.date.min
+
+    def task_counts(self):
+        """Count the tasks of these projects, keyed by project id."""
+        today = timezone.localdate()
+        open_tasks = ~models.Q(status=Task.TaskStatus.COMPLETED)
+        rows = Task.objects.filter(project__in=self).values(
+            'project_id').annotate(
+            pending_count=models.Count(
+                'pk', filter=models.Q(status=Task.TaskStatus.PENDING)),
+            in_progress_count=models.Count(
+                'pk', filter=models.Q(status=Task.TaskStatus.IN_PROGRESS)),
+            completed_count=models.Count(
+                'pk', filter=models.Q(status=Task.TaskStatus.COMPLETED)),
+            overdue_count=models.Count(
+                'pk', filter=open_tasks & models.Q(due_date__lt=today)),
+        ).order_by()
+        return {row.pop('project_id'): row for row in rows}
+
+    def rebuild_task_counters(self, batch_size=1000, commit=True):
+        """Recount the task counters in batches of projects.
+
+        Returns the ids of the projects whose stored counters were wrong.
+        Those are only rewritten when ``commit`` is true.
+        """
+        if commit:
+            self._for_write = True
+        stale = []
+        empty = dict.fromkeys(TASK_COUNTERS, 0)
+        ids = list(self.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            with transaction.atomic(using=self.db):
+                batch = self.model.all_objects.filter(
+                    pk__in=ids[start:start + batch_size])
+                if commit:
+                    batch = batch.select_for_update()
+                counts = batch.task_counts()
+                changed = []
+                for project in batch.only('pk', *TASK_COUNTERS):
+                    expected = counts.get(project.pk, empty)
+                    if any(getattr(project, field) != expected[field]
+                           for field in TASK_COUNTERS):
+                        for field in TASK_COUNTERS:
+                            setattr(project, field, expected[field])
+                        changed.append(project)
+                stale.extend(project.pk for project in changed)
+                if commit and changed:
+                    self.model.all_objects.bulk_update(
+                        changed, TASK_COUNTERS)
+        return stale
+
+    def restorable(self):
+        """Projects in the trash that are still within the undo window."""
+        return self.filter(deleted_at__gte=purge_cutoff())
+
+    def purgeable(self):
+        """Projects in the trash for longer than the undo window."""
+        return self.filter(deleted_at__lt=purge_cutoff())
+
+    def purge(self, batch_size=1000, sleep=0):
+        """Delete these projects for good; return their ids.
+
+        The tasks go first, ``batch_size`` at a time, each chunk with two
+        raw ``DELETE``s by primary key (its events, then the tasks) in its
+        own transaction, so the deletion collector never loads them and no
+        lock is held for long. ``sleep`` seconds pass between chunks. The
+        emptied project is then deleted as usual.
+        """
+        self._for_write = True
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        statements = [
+            f'DELETE FROM {quote(TaskEvent._meta.db_table)} '
+            f'WHERE {quote("task_id")} IN (%s)',
+            f'DELETE FROM {quote(Task._meta.db_table)} '
+            f'WHERE {quote("id")} IN (%s)',
+        ]
+        purged = []
+        for project_id in self.order_by('pk').values_list('pk', flat=True):
+            tasks = Task.objects.using(self.db).filter(
+                project_id=project_id).order_by()
+            while True:
+                with transaction.atomic(using=self.db):
+                    ids = list(tasks.values_list('pk', flat=True)[:batch_size])
+                    if not ids:
+                        break
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    with connection.cursor() as cursor:
+                        for sql in statements:
+                            cursor.execute(sql % placeholders, ids)
+                if sleep:
+                    time.sleep(sleep)
+            self.model.all_objects.using(self.db).filter(
+                pk=project_id).delete()
+            purged.append(project_id)
+        return purged
+
+    purge.alters_data = True
+
+
+class ProjectManager(models.Manager.from_queryset(ProjectQuerySet)):
+    """Leaves out the projects in the trash (see Project.deleted_at)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Tasks of projects owned by ``user`` or assigned to them.
+
+        The tasks of projects in the trash are left out.
+        """
+        return self.filter(
+            models.Q(project__owner=user) | models.Q(assigned_to=user),
+            project__deleted_at__isnull=True)
+
+    def assigned_work(self, user):
+        """Tasks assigned to ``user``, projects in the trash left out."""
+        return self.filter(assigned_to=user, project__deleted_at__isnull=True)
+
+    def work_summary(self, today=None):
+        """Count these tasks by status and by due-date bucket.
+
+        One aggregate query with a filtered ``COUNT`` per figure; the keys
+        are the statuses and the names of ``due_buckets()``.
+        """
+        counts = {
+            status: models.Count('pk', filter=models.Q(status=status))
+            for status in Task.TaskStatus.values
+        }
+        counts.update({
+            name: models.Count('pk', filter=condition)
+            for name, condition in due_buckets(today).items()
+        })
+        return self.aggregate(**counts)
+
+    def change_status(self, user, status, ids=None):
+        """Move the tasks among ``ids`` that ``user`` may touch to ``status``.
+
+        The owner of the project or the assignee may change a status. Both
+        that check and the transition itself are part of the ``WHERE`` of a
+        single ``UPDATE`` that only writes ``status`` and ``updated_at``.
+        The rows are locked and read first so the project counters can be
+        adjusted. Returns the sorted ids that actually changed.
+        """
+        # Read, lock and write on the primary, even from a safe request.
+        self._for_write = True
+        changing = self.visible_to(user).exclude(status=status)
+        if ids is not None:
+            changing = changing.filter(pk__in=ids)
+        with transaction.atomic(using=self.db):
+            before = {
+                row['id']: row for row in changing.select_for_update(
+                    of=('self',)).values(
+                    'id', 'assigned_to_id', *Task.TRACKED_FIELDS)
+            }
+            if not before:
+                return []
+            changing.filter(pk__in=before).update(
+                status=status, updated_at=timezone.now())
+            Project.all_objects.db_manager(self.db).apply_task_changes(
+                (state, {**state, 'status': status})
+                for state in before.values())
+            TaskEvent.objects.using(self.db).bulk_create(
+                TaskEvent.for_change(
+                    state['id'], state['project_id'],
+                    {'status': state['status']}, {'status': status},
+                    actor_id=user.pk)
+                for state in before.values())
+            tasks_changed.send(
+                sender=Task, project_ids={
+                    state['project_id'] for state in before.values()},
+                deltas=[{
+                    'id': state['id'], 'project_id': state['project_id'],
+                    'assigned_to_id': state['assigned_to_id'],
+                    'status': status,
+                } for state in before.values()])
+        return sorted(before)
+
+    change_status.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            states = [task.tracked_state() for task in objs]
+            Project.all_objects.db_manager(self.db).apply_task_changes(
+                (None, state) for state in states)
+            TaskEvent.objects.using(self.db).bulk_create(
+                TaskEvent.for_change(task.pk, task.project_id, None, {})
+                for task in objs)
+            tasks_changed.send(sender=Task, project_ids={
+                state['project_id'] for state in states},
+                deltas=[task_delta(task) for task in objs])
+        return objs
+
+    def delete(self):
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            states = list(self.values(
+                'id', 'assigned_to_id', *Task.TRACKED_FIELDS))
+            deleted = super().delete()
+            Project.all_objects.db_manager(self.db).apply_task_changes(
+                (state, None) for state in states)
+            TaskEvent.objects.using(self.db).bulk_create(
+                TaskEvent.for_change(
+                    state['id'], state['project_id'], state, None)
+                for state in states)
+            tasks_changed.send(sender=Task, project_ids={
+                state['project_id'] for state in states}, deltas=[{
+                    'id': state['id'], 'project_id': state['project_id'],
+                    'assigned_to_id': state['assigned_to_id'],
+                    'deleted': True,
+                } for state in states])
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Project(models.Model):
@@ -9,10 +344,76 @@ class Project(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized task counters, kept up to date by Task.save()/delete().
+    # overdue_count drifts as days pass: core.reminders recounts the
+    # projects of the tasks that became overdue, through the day it records
+    # in ReminderState.overdue_through.
+    pending_count = models.PositiveIntegerField(default=0, editable=False)
+    in_progress_count = models.PositiveIntegerField(
+        default=0, editable=False)
+    completed_count = models.PositiveIntegerField(default=0, editable=False)
+    overdue_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set while the project is in the trash. Deleting a project only sets
+    # it; ProjectQuerySet.purge() removes the project and its tasks once
+    # PROJECT_UNDO_DAYS have passed.
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ProjectManager()
+    all_objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_at'], name='project_trash_idx',
+                condition=models.Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.name
 
+    def soft_delete(self):
+        """Move the project to the trash; its tasks are left in place."""
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at', 'updated_at'])
+
+    soft_delete.alters_data = True
+
+    def restore(self):
+        """Take the project out of the trash."""
+        self.deleted_at = None
+        self.save(update_fields=['deleted_at', 'updated_at'])
+        # Days may have passed in the trash; catch overdue_count up.
+        Project.all_objects.filter(pk=self.pk).rebuild_task_counters()
+
+    restore.alters_data = True
+
+    @property
+    def purge_at(self):
+        """When the project leaves the trash for good."""
+        if self.deleted_at is None:
+            return None
+        return self.deleted_at + datetime.timedelta(
+            days=settings.PROJECT_UNDO_DAYS)
+
+    def assignee_candidates(self, prefix='', limit=10):
+        """Active users whose username starts with ``prefix``.
+
+        The project's participants (its owner and the users already
+        assigned to its tasks) come first, then everybody else. Both
+        lookups are case-sensitive prefix matches so they can walk the
+        username index instead of scanning ``auth_user``.
+        """
+        users = User.objects.filter(
+            is_active=True, username__startswith=prefix
+        ).only('id', 'username').order_by('username')
+        participant = models.Q(pk=self.owner_id) | models.Q(
+            pk__in=Task.objects.filter(project=self, assigned_to__isnull=False)
+            .values('assigned_to'))
+        candidates = list(users.filter(participant)[:limit])
+        if len(candidates) < limit:
+            candidates += users.exclude(participant)[:limit - len(candidates)]
+        return candidates
+
 
 class Task(models.Model):
     class TaskStatus(models.TextChoices):
@@ -20,6 +421,9 @@ class Task(models.Model):
         IN_PROGRESS = 'in_progress', 'En progreso'
         COMPLETED = 'completed', 'Completada'
 
+    # Fields whose last saved value is remembered to compute deltas.
+    TRACKED_FIELDS = ('project_id', 'status', 'due_date')
+
     project = models.ForeignKey(
         Project, on_delete=models.CASCADE, related_name='tasks')
     title = models.CharField(max_length=255)
@@ -34,5 +438,204 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Status filter of the task list and the admin list_filter.
+            models.Index(
+                fields=['project', 'status', 'due_date'],
+                name='task_project_status_due_idx'),
+            # Keyset pagination of the task list.
+            models.Index(
+                fields=['project', 'created_at', 'id'],
+                name='task_project_created_idx'),
+            # "Assigned to me" side of the visibility checks.
+            models.Index(
+                fields=['assigned_to', 'status'],
+                name='task_assignee_status_idx'),
+            # Open tasks by due date (overdue / due soon).
+            models.Index(
+                fields=['due_date'],
+                condition=~models.Q(status='completed'),
+                name='task_open_due_idx'),
+            # Keyset pagination of the open tasks on the dashboard.
+            models.Index(
+                fields=['assigned_to', 'created_at', 'id'],
+                condition=~models.Q(status='completed'),
+                name='task_assignee_open_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_state = instance.tracked_state()
+        instance._history_state = history_state(instance)
+        return instance
+
+    def tracked_state(self):
+        """Current value of ``TRACKED_FIELDS``, or None if any is deferred."""
+        deferred = self.get_deferred_fields()
+        if any(field in deferred for field in self.TRACKED_FIELDS):
+            return None
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+
+    def _fetch_state(self, using):
+        return Task.objects.using(using).filter(pk=self.pk).values(
+            *self.TRACKED_FIELDS).first()
+
+    def _last_saved_state(self, using):
+        if self._state.adding:
+            return None
+        state = getattr(self, '_saved_state', None)
+        if state is None:
+            state = self._fetch_state(using)
+        return state
+
+    def _last_history_state(self, using):
+        if self._state.adding:
+            return None
+        state = getattr(self, '_history_state', None)
+        if state is None:
+            state = Task.objects.using(using).filter(pk=self.pk).values(
+                *HISTORY_FIELDS).first()
+        return state
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            Task, instance=self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Compare attnames: update_fields may name a foreign key either
+            # way ('project' or 'project_id').
+            update_fields = {self._meta.get_field(field).attname
+                             for field in update_fields}
+        history_fields = HISTORY_FIELDS if update_fields is None else [
+            field for field in HISTORY_FIELDS if field in update_fields]
+        with transaction.atomic(using=using):
+            before = self._last_saved_state(using)
+            history_before = self._last_history_state(using)
+            super().save(*args, **kwargs)
+            history_after = history_state(self, history_fields)
+            event = TaskEvent.for_change(
+                self.pk, self.project_id, history_before, history_after)
+            if event is not None:
+                event.save(using=using)
+            after = self.tracked_state()
+            if before is not None and update_fields is not None:
+                # Only the listed fields reached the database.
+                after = {
+                    field: getattr(self, field)
+                    if field in update_fields else before[field]
+                    for field in self.TRACKED_FIELDS
+                }
+            elif after is None:
+                after = self._fetch_state(using)
+            Project.all_objects.db_manager(using).apply_task_changes(
+                [(before, after)])
+        self._saved_state = after
+        self._history_state = {**(history_before or {}), **history_after}
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            Task, instance=self)
+        pk = self.pk
+        with transaction.atomic(using=using):
+            before = self._last_saved_state(using)
+            deleted = super().delete(*args, **kwargs)
+            Project.all_objects.db_manager(using).apply_task_changes(
+                [(before, None)])
+            if before is not None:
+                TaskEvent.for_change(
+                    pk, before['project_id'], before, None).save(using=using)
+                tasks_changed.send(
+                    sender=Task, project_ids=[before['project_id']],
+                    deltas=[{
+                        'id': pk, 'project_id': before['project_id'],
+                        'assigned_to_id': self.assigned_to_id,
+                        'deleted': True,
+                    }])
+        self._saved_state = None
+        return deleted
+
+
+class ReminderState(models.Model):
+    """High-water marks of the due date reminders (see core.reminders).
+
+    A single row: tasks due on or before ``overdue_through`` have had their
+    overdue reminder, and those due on or before ``due_soon_through`` their
+    due-soon one.
+    """
+    overdue_through = models.DateField()
+    due_soon_through = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class BaseTaskEvent(models.Model):
+    class Kind(models.IntegerChoices):
+        CREATED = 1, 'Creada'
+        UPDATED = 2, 'Editada'
+        STATUS_CHANGED = 3, 'Cambio de estado'
+        REASSIGNED = 4, 'Reasignada'
+        DELETED = 5, 'Eliminada'
+
+    # Plain references without constraints or cascades: the log outlives
+    # its tasks and users and never slows down their deletion.
+    task = models.ForeignKey(
+        Task, on_delete=models.DO_NOTHING, db_constraint=False,
+        db_index=False, related_name='+')
+    project_id = models.BigIntegerField()
+    actor = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        db_index=False, null=True, related_name='+')
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    diff = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        abstract = True
+
+
+class TaskEvent(BaseTaskEvent):
+    """Append-only log of task changes (see core.history)."""
+
+    class Meta:
+        indexes = [
+            # History of a task, newest first.
+            models.Index(
+                fields=['task', '-created_at', '-id'],
+                name='taskevent_task_created_idx'),
+            # Range scans of archive_task_events.
+            models.Index(fields=['created_at'], name='taskevent_created_idx'),
+        ]
+
+    @classmethod
+    def for_change(cls, task_id, project_id, before, after, actor_id=None):
+        """Event for a task going from ``before`` to ``after``, or None.
+
+        A ``None`` state stands for a task that did not exist.
+        """
+        if before is None:
+            kind, diff = cls.Kind.CREATED, {}
+        elif after is None:
+            kind, diff = cls.Kind.DELETED, {}
+        else:
+            diff = diff_states(before, after)
+            if not diff:
+                return None
+            kind = {
+                'status': cls.Kind.STATUS_CHANGED,
+                'assigned_to_id': cls.Kind.REASSIGNED,
+            }.get(next(iter(diff)) if len(diff) == 1 else None,
+                  cls.Kind.UPDATED)
+        return cls(task_id=task_id, project_id=project_id, kind=kind,
+                   diff=diff, actor_id=actor_id or current_actor_id())
+
+
+class TaskEventArchive(BaseTaskEvent):
+    """Task events moved out of TaskEvent by archive_task_events."""
+
+    id = models.BigIntegerField(primary_key=True)
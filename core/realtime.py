@@ -0,0 +1,127 @@
+"""Push of task changes to open task boards.
+
+Writes publish compact per-project deltas once their transaction commits;
+``webtask.async_views.TaskEventsView`` relays them to browsers as
+Server-Sent Events. Fan-out goes through the broker named by
+``settings.REALTIME_BROKER``. The default ``InProcessBroker`` only reaches
+subscribers of the same process, which is enough for a single instance and
+for tests; a multi-instance deployment plugs in a broker with the same
+``publish``/``subscribe`` methods backed by a shared bus (e.g. Redis
+pub/sub).
+
+A delta always carries ``id``, ``project_id`` and ``assigned_to_id`` plus
+only the fields that are known to have changed; ``deleted`` marks a task
+that left the project.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+CHANNEL = 'project:%s'
+
+
+class Subscription:
+    """Messages of one channel, buffered for a single consumer."""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        """Queue ``message``; runs on the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and ask for a reload.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'resync': True})
+
+    async def get(self, timeout=None):
+        """Next message, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan-out to the subscribers living in this process."""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Subscribe from a coroutine; call ``close()`` when done."""
+        subscription = Subscription(self, channel, self.maxsize)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, message):
+        """Deliver ``message`` to every subscriber; safe from any thread."""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, message)
+            except RuntimeError:
+                # The subscriber's event loop is gone.
+                self.unsubscribe(subscription)
+
+
+@cache
+def get_broker():
+    return import_string(settings.REALTIME_BROKER)()
+
+
+def task_delta(task, **changes):
+    """Delta describing ``task``; ``changes`` default to its fields."""
+    delta = {
+        'id': task.pk,
+        'project_id': task.project_id,
+        'assigned_to_id': task.assigned_to_id,
+    }
+    delta.update(changes or {
+        'title': task.title,
+        'status': task.status,
+        'due_date': task.due_date and task.due_date.isoformat(),
+    })
+    return delta
+
+
+def publish_task_deltas(deltas, using=None):
+    """Broadcast ``deltas`` per project once the transaction commits."""
+    by_project = defaultdict(list)
+    for delta in deltas:
+        by_project[delta['project_id']].append(delta)
+    if not by_project:
+        return
+
+    def publish():
+        broker = get_broker()
+        for project_id, tasks in by_project.items():
+            broker.publish(CHANNEL % project_id, {'tasks': tasks})
+
+    transaction.on_commit(publish, using=using)
@@ -0,0 +1,167 @@
+"""Digests of the tasks that became overdue or are due soon.
+
+``run_reminders()`` is called periodically by ``manage.py run_scheduler``.
+Each run only looks at the due dates past the high-water marks stored in
+``ReminderState``, a range scan on the ``task_open_due_idx`` partial index,
+so the task table is never rescanned. The open tasks found are grouped by
+assignee and handed, one digest per user, to the sender named by
+``settings.REMINDER_SENDER``.
+
+The state row stays locked until the marks have moved past the dates just
+sent, in the same transaction, so restarted or concurrent schedulers never
+remind a day twice. If delivery fails the marks do not move and the next
+run retries the same days; a process killed mid-delivery may therefore
+resend a digest, but never skips one. Tasks whose due date is moved behind
+a mark are not reminded.
+"""
+import datetime
+import json
+import sys
+from dataclasses import dataclass, field
+from functools import cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Project, ReminderState, Task
+from core.signals import invalidate
+
+
+@dataclass
+class Digest:
+    """The reminders of one user."""
+
+    user: object
+    overdue: list = field(default_factory=list)
+    due_soon: list = field(default_factory=list)
+
+    def subject(self):
+        return (f'Tareas: {len(self.overdue)} vencida(s), '
+                f'{len(self.due_soon)} por vencer')
+
+    def body(self):
+        lines = [f'Hola {self.user.username},', '']
+        for title, tasks in (('Vencidas:', self.overdue),
+                             ('Por vencer:', self.due_soon)):
+            if tasks:
+                lines.append(title)
+                lines += [f'- {task.title} ({task.project.name}), '
+                          f'vence el {task.due_date:%d/%m/%Y}'
+                          for task in tasks]
+                lines.append('')
+        return '\n'.join(lines)
+
+    def as_dict(self):
+        return {
+            'user_id': self.user.pk,
+            'email': self.user.email,
+            'overdue': [task.pk for task in self.overdue],
+            'due_soon': [task.pk for task in self.due_soon],
+        }
+
+
+class ConsoleSender:
+    """Write the digests to standard output."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, digests):
+        for digest in digests:
+            self.stream.write(
+                f'To: {digest.user.email or digest.user.username}\n'
+                f'Subject: {digest.subject()}\n\n{digest.body()}\n')
+
+
+class FileSender:
+    """Append the digests as JSON lines to ``settings.REMINDER_FILE``."""
+
+    def send(self, digests):
+        with open(settings.REMINDER_FILE, 'a', encoding='utf-8') as f:
+            for digest in digests:
+                f.write(json.dumps(digest.as_dict()) + '\n')
+
+
+class EmailSender:
+    """Email each digest, all over one connection of ``EMAIL_BACKEND``."""
+
+    def send(self, digests):
+        get_connection().send_messages([
+            EmailMessage(digest.subject(), digest.body(),
+                         to=[digest.user.email])
+            for digest in digests if digest.user.email
+        ])
+
+
+@cache
+def get_sender():
+    return import_string(settings.REMINDER_SENDER)()
+
+
+def open_tasks_due(after, through):
+    """Open tasks due in ``(after, through]``, in due date order.
+
+    The tasks of projects in the trash are left out.
+    """
+    # The exclude() matches the condition of task_open_due_idx.
+    return Task.objects.exclude(status=Task.TaskStatus.COMPLETED).filter(
+        due_date__gt=after, due_date__lte=through,
+        project__deleted_at__isnull=True,
+    ).select_related('project', 'assigned_to').order_by('due_date', 'id')
+
+
+def run_reminders(today=None, sender=None):
+    """Send the reminders due since the last run; return the digests."""
+    today = today or timezone.localdate()
+    sender = sender or get_sender()
+    yesterday = today - datetime.timedelta(days=1)
+    soon = today + datetime.timedelta(days=settings.REMINDER_DUE_SOON_DAYS)
+    with transaction.atomic():
+        # The first run starts with the tasks that became overdue today.
+        state, first_run = ReminderState.objects.select_for_update(
+        ).get_or_create(
+            pk=1, defaults={
+                'overdue_through': yesterday - datetime.timedelta(days=1),
+                'due_soon_through': yesterday,
+            })
+        overdue = list(open_tasks_due(state.overdue_through, yesterday))
+        # Days already past are reported as overdue, not as due soon.
+        due_soon = list(open_tasks_due(
+            max(state.due_soon_through, yesterday), soon))
+        digests = {}
+        for kind, tasks in (('overdue', overdue), ('due_soon', due_soon)):
+            for task in tasks:
+                if task.assigned_to is None or not task.assigned_to.is_active:
+                    continue
+                digest = digests.get(task.assigned_to_id)
+                if digest is None:
+                    digest = digests[task.assigned_to_id] = Digest(
+                        task.assigned_to)
+                getattr(digest, kind).append(task)
+        digests = list(digests.values())
+        if digests:
+            sender.send(digests)
+        state.overdue_through = max(state.overdue_through, yesterday)
+        state.due_soon_through = max(state.due_soon_through, soon)
+        state.save()
+        # The overdue counters of these projects drifted when the day
+        # changed (see Project); recount them while they are at hand.
+        # Nothing was recounted before the first run, so that one recounts
+        # every project with an overdue task: from then on the tasks due
+        # through overdue_through are counted (see apply_task_changes).
+        if first_run:
+            stale = Project.all_objects.filter(
+                pk__in=Task.objects.exclude(
+                    status=Task.TaskStatus.COMPLETED).filter(
+                    due_date__lte=yesterday).values('project_id')
+            ).rebuild_task_counters()
+            invalidate(stale)
+        elif overdue:
+            stale = Project.objects.filter(
+                pk__in={task.project_id for task in overdue}
+            ).rebuild_task_counters()
+            invalidate(stale)
+    return digests
@@ -0,0 +1,86 @@
+"""Read-replica routing (``settings.DATABASE_REPLICAS``).
+
+``ReplicaRouter`` sends writes to ``default`` and, inside a
+``routing_scope()``, reads to one replica per scope. A scope is opened for
+every request by ``webtask.middleware.ReplicaPinMiddleware``; outside one
+(management commands, the scheduler, the shell) everything reads from the
+primary.
+
+Reads still go to the primary when the scope is pinned, once the scope
+has written anything, and inside a transaction on the primary, where the
+rows read are usually the ones about to be written.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_scope = ContextVar('replica_routing_scope', default=None)
+
+
+class RoutingScope:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """Allow replica reads in this block, unless ``pinned``.
+
+    Yields the ``RoutingScope``; its ``wrote`` tells whether the block sent
+    anything to the primary.
+    """
+    scope = RoutingScope(pinned)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def read_from_replica():
+    """Whether the current routing scope has read from a replica.
+
+    What it read may lag behind the primary, so it must not be cached under
+    keys that only change with writes to the primary.
+    """
+    scope = _scope.get()
+    return scope is not None and scope.replica is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        replicas = settings.DATABASE_REPLICAS
+        if (scope is None or scope.pinned or not replicas
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        # Related objects come from where the instance was loaded.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if scope.replica is None:
+            scope.replica = random.choice(replicas)
+        return scope.replica
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            # Read our own writes for the rest of the scope.
+            scope.pinned = scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,76 @@
+"""Ranked full-text search over tasks and projects.
+
+The index is maintained by the database (migration 0008): a generated
+``search_vector`` column with a GIN index on PostgreSQL, an FTS5 table kept
+in sync by triggers on SQLite. Other backends fall back to an unranked
+``icontains`` match.
+
+Results carry a ``rank`` annotation (higher is better) and are meant to be
+paginated with ``SEARCH_ORDERING``.
+"""
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from core.models import Project, Task
+
+SEARCH_ORDERING = ('-rank', 'id')
+
+# Searched columns of each model: (table, weight-A column, weight-B column).
+SEARCH_COLUMNS = {
+    Task: ('core_task', 'title', 'description'),
+    Project: ('core_project', 'name', 'description'),
+}
+
+
+def fts5_query(text):
+    """Quote every word so user input is never parsed as FTS5 syntax."""
+    return ' '.join(
+        '"%s"' % word.replace('"', '""') for word in text.split())
+
+
+def search(queryset, text):
+    """Rows of ``queryset`` matching ``text``, annotated with ``rank``."""
+    if not text.strip():
+        return queryset.none()
+    table, a, b = SEARCH_COLUMNS[queryset.model]
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('spanish', %s)"
+        match = RawSQL(f'{table}.search_vector @@ {tsquery}', (text,),
+                       output_field=BooleanField())
+        rank = RawSQL(
+            f'ts_rank_cd({table}.search_vector, {tsquery})::float8', (text,),
+            output_field=FloatField())
+    elif vendor == 'sqlite':
+        text = fts5_query(text)
+        match = RawSQL(
+            f'{table}.id IN (SELECT rowid FROM {table}_fts '
+            f'WHERE {table}_fts MATCH %s)', (text,),
+            output_field=BooleanField())
+        # bm25() is lower for better matches; title counts ten times more.
+        rank = RawSQL(
+            f'(SELECT -bm25({table}_fts, 10.0, 1.0) FROM {table}_fts '
+            f'WHERE {table}_fts MATCH %s AND rowid = {table}.id)', (text,),
+            output_field=FloatField())
+    else:
+        match = Q(**{f'{a}__icontains': text}) | Q(
+            **{f'{b}__icontains': text})
+        rank = Value(0.0, output_field=FloatField())
+    return queryset.filter(match).annotate(rank=rank)
+
+
+def search_tasks(text, user=None):
+    """Tasks matching ``text``, limited to those ``user`` may see."""
+    tasks = Task.objects.all()
+    if user is not None:
+        tasks = tasks.visible_to(user)
+    return search(tasks, text)
+
+
+def search_projects(text, user=None):
+    """Projects matching ``text``, limited to those ``user`` may see."""
+    projects = Project.objects.all()
+    if user is not None:
+        projects = projects.visible_to(user)
+    return search(projects, text)
@@ -0,0 +1,52 @@
+"""Signals of the core app and the receivers that keep caches fresh."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from core.generations import bump_generations
+from core.realtime import publish_task_deltas, task_delta
+
+# Sent by Task.delete() and the bulk operations of TaskQuerySet, which
+# bypass post_save. There is deliberately no post_delete receiver for Task:
+# it would stop the deletion collector from fast-deleting the tasks of a
+# deleted project. Arguments: project_ids and deltas (see core.realtime).
+tasks_changed = Signal()
+
+
+def invalidate(project_ids):
+    """Bump now and again on commit.
+
+    The second bump drops pages that a concurrent request rendered from
+    the data as it was before this transaction committed.
+    """
+    project_ids = set(project_ids)
+    bump_generations(project_ids)
+    transaction.on_commit(lambda: bump_generations(project_ids))
+
+
+@receiver(post_save, sender='core.Project')
+@receiver(post_delete, sender='core.Project')
+def project_written(sender, instance, **kwargs):
+    invalidate([instance.pk])
+
+
+@receiver(post_save, sender='core.Task')
+def task_written(sender, instance, using, **kwargs):
+    project_ids = [instance.project_id]
+    deltas = [task_delta(instance)]
+    previous = getattr(instance, '_saved_state', None)
+    if previous:
+        # The task may have moved from another project.
+        project_ids.append(previous['project_id'])
+        if previous['project_id'] != instance.project_id:
+            deltas.append({
+                'id': instance.pk, 'project_id': previous['project_id'],
+                'assigned_to_id': instance.assigned_to_id, 'deleted': True})
+    invalidate(project_ids)
+    publish_task_deltas(deltas, using)
+
+
+@receiver(tasks_changed)
+def tasks_bulk_written(sender, project_ids, deltas=(), **kwargs):
+    invalidate(project_ids)
+    publish_task_deltas(deltas)
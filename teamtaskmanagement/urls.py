@@ -19,6 +19,6 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    # path('api/', include('api.urls', 'api')),
+    path('api/', include('api.urls', 'api')),
     path('', include('webtask.urls'), name='webtask')
 ]
@@ -0,0 +1,154 @@
+"""Async variants of the read-heavy webtask views.
+
+Served instead of the sync views when ``settings.ASYNC_VIEWS`` is on, so
+that under ASGI (uvicorn) these pages run on the event loop without a
+thread-pool hop. Queries use the async ORM; only template rendering, which
+may touch the session for flash messages, runs in a worker thread. Every
+relation the templates read is loaded up front.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.views import View
+
+from core.models import Project, Task
+from core.realtime import CHANNEL, get_broker
+from .cache import CachedPageMixin, task_row_context
+from .pagination import InvalidCursor, apaginate_keyset
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """``LoginRequiredMixin`` that loads the user with ``request.auser()``."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Replace the lazy user so nothing loads it synchronously later.
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncTemplateView(View):
+    template_name = None
+
+    async def render(self, context):
+        return await sync_to_async(render)(
+            self.request, self.template_name, context)
+
+
+class ProjectListView(AsyncLoginRequiredMixin, CachedPageMixin,
+                      AsyncTemplateView):
+    template_name = 'projects.html'
+
+    def get_queryset(self):
+        return Project.objects.visible_to(self.request.user)
+
+    def get_cached_project_ids(self):
+        return self.get_queryset().values_list('pk', flat=True)
+
+    async def get(self, request, *args, **kwargs):
+        projects = [
+            project async for project in self.get_queryset().aiterator()]
+        return await self.render({'projects': projects})
+
+
+class TaskListView(AsyncLoginRequiredMixin, CachedPageMixin,
+                   AsyncTemplateView):
+    template_name = 'tasks.html'
+    paginate_by = 50
+    keyset_ordering = ('created_at', 'id')
+
+    async def get(self, request, project_id, *args, **kwargs):
+        project = await Project.objects.visible_to(request.user).filter(
+            pk=project_id).afirst()
+        if not project:
+            raise Http404("No tienes permiso para ver este proyecto")
+        tasks = Task.objects.visible_to(request.user).filter(
+            project_id=project_id
+        ).select_related('assigned_to', 'project__owner')
+        status_filter = request.GET.get('status')
+        if status_filter in Task.TaskStatus.values:
+            tasks = tasks.filter(status=status_filter)
+        try:
+            page = await apaginate_keyset(
+                tasks, request.GET.get('cursor'), self.paginate_by,
+                self.keyset_ordering)
+        except InvalidCursor:
+            raise Http404('Cursor inválido')
+        return await self.render({
+            'project': project,
+            'tasks': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'selected_status': request.GET.get('status', ""),
+            'status_labels': dict(Task.TaskStatus.choices),
+            **task_row_context(project, request.user),
+        })
+
+
+class TaskDetailView(AsyncLoginRequiredMixin, AsyncTemplateView):
+    template_name = 'task_detail.html'
+
+    async def get(self, request, project_id, pk, *args, **kwargs):
+        task = await Task.objects.visible_to(request.user).select_related(
+            'project', 'assigned_to'
+        ).filter(pk=pk, project__id=project_id).afirst()
+        if task is None:
+            raise Http404("No Task matches the given query.")
+        return await self.render({
+            'task': task,
+            'object': task,
+            'project': task.project,
+        })
+
+
+class TaskEventsView(AsyncLoginRequiredMixin, View):
+    """Server-Sent Events stream of the task deltas of one project.
+
+    The owner receives every delta; other users only those of the tasks
+    assigned to them, as on the task list.
+    """
+
+    async def get(self, request, project_id, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI worker would be tied up for as long as the page is open.
+            return HttpResponse(
+                'Requiere un servidor ASGI', status=501,
+                content_type='text/plain; charset=utf-8')
+        project = await Project.objects.visible_to(request.user).filter(
+            pk=project_id).afirst()
+        if not project:
+            raise Http404("No tienes permiso para ver este proyecto")
+        is_owner = project.owner_id == request.user.pk
+        response = StreamingHttpResponse(
+            self.stream(project.pk, None if is_owner else request.user.pk),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, project_id, assignee_id):
+        subscription = get_broker().subscribe(CHANNEL % project_id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                message = await subscription.get(settings.SSE_HEARTBEAT)
+                if message is None:
+                    yield ': ping\n\n'
+                    continue
+                if message.get('resync'):
+                    yield 'event: resync\ndata: {}\n\n'
+                    continue
+                tasks = [
+                    delta for delta in message['tasks']
+                    if assignee_id is None
+                    or delta['assigned_to_id'] == assignee_id]
+                if tasks:
+                    yield f'event: tasks\ndata: {json.dumps(tasks)}\n\n'
+        finally:
+            subscription.close()
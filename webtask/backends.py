@@ -0,0 +1,31 @@
+"""Authentication backends."""
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate with email and password in a single user lookup.
+
+    The email is matched case-insensitively through ``LOWER(email)``, which
+    is backed by the ``auth_user_email_lower_idx`` expression index.
+
+    Like ``AllowAllUsersModelBackend`` it returns inactive users whose
+    password is correct, so ``LoginForm`` can tell them apart from a wrong
+    password; restoring a session still rejects them (``get_user``).
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = User._default_manager.annotate(
+            email_lower=Lower('email')).filter(
+            email_lower=email.lower()).order_by('pk').first()
+        if user is None:
+            # Run the hasher once anyway so that unknown emails take as
+            # long as wrong passwords.
+            User().set_password(password)
+            return None
+        if user.check_password(password):
+            return user
+        return None
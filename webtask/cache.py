@@ -0,0 +1,160 @@
+"""Server-side cache of rendered project and task pages.
+
+A page is cached per user and per request path (query string included),
+under a key that also carries the generation of every project shown on it
+(see ``core.generations``), so any write to those projects or their tasks
+makes the old entry unreachable. A page read from a replica
+(``core.routers``) is only cached when none of its projects was written
+within ``REPLICA_PIN_SECONDS``: before that the replica may not have
+caught up with the write that moved the generation.
+
+Below that, ``_task_row.html`` caches each task row of the task list by
+task id, ``updated_at`` and viewer role, so a page rebuilt after a write
+only renders the rows that changed.
+
+The dashboard figures of ``work_summary()`` span every project of a user,
+so they are not tied to generations; they are simply kept per user for
+the short ``DASHBOARD_CACHE_TIMEOUT``.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+
+from core.generations import get_generations, recently_written
+from core.models import Task
+from core.routers import read_from_replica
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(view_name, outcome):
+    with _stats_lock:
+        _stats[(view_name, outcome)] += 1
+
+
+def page_cache_stats():
+    """Hits and misses per view since the process started."""
+    with _stats_lock:
+        stats = {}
+        for (view_name, outcome), count in _stats.items():
+            stats.setdefault(view_name, {'hit': 0, 'miss': 0})[outcome] = count
+        return stats
+
+
+def task_row_context(project, user):
+    """Context ``_task_row.html`` needs to cache rows of ``project``."""
+    return {
+        'viewer_role': 'owner' if project.owner_id == user.id else 'viewer',
+        'row_cache_timeout': settings.TASK_ROW_CACHE_TIMEOUT,
+    }
+
+
+def work_summary(user):
+    """``Task.objects.work_summary()`` of the tasks assigned to ``user``."""
+    timeout = settings.DASHBOARD_CACHE_TIMEOUT
+    # The buckets move at midnight, and the key with them.
+    key = f'work_summary:{user.pk}:{timezone.localdate()}'
+    summary = cache.get(key) if timeout else None
+    if summary is None:
+        summary = Task.objects.assigned_work(user).work_summary()
+        if timeout:
+            cache.set(key, summary, timeout)
+    return summary
+
+
+class CachedPageMixin:
+    """Serve GET responses of a view from the cache.
+
+    The page depends on the project of the ``project_id`` URL argument;
+    pages showing other projects override ``get_cached_project_ids()``.
+    Requests carrying flash messages are never served from or written to
+    the cache.
+    """
+
+    def get_cached_project_ids(self):
+        return [self.kwargs['project_id']]
+
+    def get_page_cache_key(self):
+        request = self.request
+        # Forms on the page embed a CSRF token tied to this secret.
+        get_token(request)
+        self.page_project_ids = list(self.get_cached_project_ids())
+        generations = get_generations(self.page_project_ids)
+        digest = hashlib.md5(usedforsecurity=False)
+        for part in (request.get_full_path(),
+                     request.META.get('CSRF_COOKIE', ''),
+                     sorted(generations.items())):
+            digest.update(repr(part).encode())
+        return 'page:%s:%s:%s' % (
+            self.__class__.__name__, request.user.pk, digest.hexdigest())
+
+    def get_request_cache_key(self):
+        """Cache key of this request, or None if it must not be cached."""
+        request = self.request
+        if (request.method != 'GET' or not self.page_cache_timeout()
+                or not request.user.is_authenticated
+                or len(messages.get_messages(request))):
+            return None
+        return self.get_page_cache_key()
+
+    def page_cache_timeout(self):
+        return getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch_cached(request, *args, **kwargs)
+        key = self.get_request_cache_key()
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+        view_name = self.__class__.__name__
+        cached = cache.get(key)
+        if cached is not None:
+            record(view_name, 'hit')
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        record(view_name, 'miss')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'render'):
+            response.add_post_render_callback(
+                lambda rendered: self.cache_page(key, rendered))
+        return response
+
+    def may_cache_page(self):
+        """Whether the page just rendered is fresh enough to be cached."""
+        return (not read_from_replica()
+                or not recently_written(self.page_project_ids))
+
+    def cache_page(self, key, response):
+        if self.may_cache_page():
+            cache.set(key, (response.content, response['Content-Type']),
+                      self.page_cache_timeout())
+
+    async def adispatch_cached(self, request, *args, **kwargs):
+        """``dispatch`` for async views, which return rendered responses."""
+        # Reading flash messages may load the session synchronously.
+        key = await sync_to_async(self.get_request_cache_key)()
+        if key is None:
+            return await super().dispatch(request, *args, **kwargs)
+        view_name = self.__class__.__name__
+        cached = await cache.aget(key)
+        if cached is not None:
+            record(view_name, 'hit')
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        record(view_name, 'miss')
+        response = await super().dispatch(request, *args, **kwargs)
+        if (response.status_code == 200
+                and await sync_to_async(self.may_cache_page)()):
+            await cache.aset(
+                key, (response.content, response['Content-Type']),
+                self.page_cache_timeout())
+        return response
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.urls import reverse
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Submit, Layout, HTML
 from core.models import Project, Task
@@ -16,8 +17,10 @@ class LoginForm(forms.Form):
         label=("Password"), widget=forms.PasswordInput, required=True)
     required_css_class = 'required'
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, request=None, **kwargs):
         """Init."""
+        self.request = request
+        self.user_cache = None
         super(LoginForm, self).__init__(*args, **kwargs)
         self.helper = FormHelper()
         self.helper.add_input(
@@ -25,30 +28,23 @@ class LoginForm(forms.Form):
         self.helper.form_method = 'POST'
 
     def clean(self):
-        """Clean."""
+        """Authenticate once and keep the user for ``login()``."""
         email = self.cleaned_data.get('email', '').lower()
         password = self.cleaned_data.get('password')
-        user = None
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        if not email or not password:
+            return self.cleaned_data
+        user = authenticate(self.request, email=email, password=password)
+        if not user:
             raise forms.ValidationError(
                 ('Email or password incorrect, please try again.'))
         if user.is_active is False:
             raise forms.ValidationError(('Your account is not active.'))
-        user = authenticate(username=user.username, password=password)
-        if not user:
-            raise forms.ValidationError(
-                ('Email or password incorrect, please try again.'))
+        self.user_cache = user
         return self.cleaned_data
 
     def login(self):
         """Login method."""
-        email = self.cleaned_data.get('email', '').lower()
-        password = self.cleaned_data.get('password')
-        username = User.objects.get(email=email).username
-        user = authenticate(username=username, password=password)
-        return user
+        return self.user_cache
 
 
 class SignUpForm(forms.ModelForm):
@@ -122,17 +118,44 @@ class ProjectForm(forms.ModelForm):
         self.helper.form_method = 'POST'
 
 
+class AssigneeInput(forms.TextInput):
+    """Search-as-you-type user picker.
+
+    Renders a hidden input with the user id and a search box fed by the
+    assignee search endpoint (``data-url``), so the choices of the field
+    are never iterated.
+    """
+
+    template_name = 'widgets/assignee.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        value = context['widget']['value']
+        # A form sent back with errors may carry anything in the value.
+        context['widget']['label'] = str(value).isdigit() and (
+            User.objects.filter(pk=value).values_list(
+                'username', flat=True).first()) or ''
+        return context
+
+
 class TaskForm(forms.ModelForm):
     class Meta:
         model = Task
         fields = ['title', 'description', 'due_date', 'status', 'assigned_to']
         widgets = {
             'due_date': forms.DateInput(attrs={'type': 'date'}),
+            'assigned_to': AssigneeInput,
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, project_id=None, **kwargs):
         super(TaskForm, self).__init__(*args, **kwargs)
         self.fields['title'].required = True
+        # Validation looks the submitted id up; there is no choice list.
+        self.fields['assigned_to'].queryset = User.objects.filter(
+            is_active=True)
+        if project_id is not None:
+            self.fields['assigned_to'].widget.attrs['data-url'] = reverse(
+                'assignee_search', kwargs={'project_id': project_id})
         for field in self.fields.values():
             field.widget.attrs['autocomplete'] = 'off'
         self.helper = FormHelper()
@@ -149,6 +172,52 @@ class TaskForm(forms.ModelForm):
         self.helper.form_method = 'POST'
 
 
+class TaskDataForm(forms.ModelForm):
+    """``TaskForm`` rules without the ``assigned_to`` choice field.
+
+    Used to validate many tasks at once (API, imports): the caller resolves
+    the assignees of the whole batch with a single query.
+    """
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'due_date', 'status']
+
+
+class TaskExportForm(forms.Form):
+    """Filters and format of a task export (``webtask.export``)."""
+
+    format = forms.ChoiceField(
+        choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], required=False)
+    project = forms.IntegerField(required=False, min_value=1)
+    status = forms.ChoiceField(
+        choices=[('', '')] + Task.TaskStatus.choices, required=False)
+    assignee = forms.IntegerField(required=False, min_value=1)
+    created_from = forms.DateField(required=False)
+    created_to = forms.DateField(required=False)
+
+    def filters(self):
+        return {name: value for name, value in self.cleaned_data.items()
+                if name != 'format'}
+
+
+class TaskImportForm(forms.Form):
+    """Upload of a CSV or NDJSON file of tasks (``webtask.importer``)."""
+
+    file = forms.FileField(label='Archivo')
+    format = forms.ChoiceField(
+        label='Formato', required=False,
+        choices=[('', 'Según la extensión'), ('csv', 'CSV'),
+                 ('ndjson', 'NDJSON')])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.add_input(
+            Submit('submit', ('Importar'), css_class='btn-primary'))
+        self.helper.form_method = 'POST'
+
+
 # class UsersForm(forms.ModelForm):
 #     """Users Form."""
 
@@ -0,0 +1,61 @@
+"""Measure password hashes, queries and time per LoginForm login.
+
+Runs inside a transaction that is rolled back, so the benchmark user never
+reaches the database.
+"""
+import time
+from unittest import mock
+
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from webtask.forms import LoginForm
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the LoginForm authentication path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20)
+
+    def measure(self, data, logins):
+        hasher_class = type(get_hasher())
+        encode = hasher_class.encode
+        calls = []
+
+        def counting_encode(hasher, *args, **kwargs):
+            calls.append(1)
+            return encode(hasher, *args, **kwargs)
+
+        with mock.patch.object(hasher_class, 'encode', counting_encode), \
+                CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(logins):
+                LoginForm(data).is_valid()
+            elapsed = time.perf_counter() - start
+        return (len(calls) / logins, len(queries) / logins,
+                elapsed * 1000 / logins)
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        with transaction.atomic():
+            User.objects.create_user(
+                'bench-login', 'Bench.Login@example.com', 'bench-password')
+            cases = [
+                ('valid', {'email': 'bench.login@example.com',
+                           'password': 'bench-password'}),
+                ('wrong password', {'email': 'bench.login@example.com',
+                                    'password': 'nope'}),
+                ('unknown email', {'email': 'nobody@example.com',
+                                   'password': 'nope'}),
+            ]
+            self.stdout.write(
+                f'{"case":<16}{"hashes":>8}{"queries":>9}{"ms":>9}')
+            for name, data in cases:
+                hashes, queries, ms = self.measure(data, logins)
+                self.stdout.write(
+                    f'{name:<16}{hashes:>8.1f}{queries:>9.1f}{ms:>9.1f}')
+            transaction.set_rollback(True)
@@ -0,0 +1,91 @@
+"""Measure how long the task list template takes to render a large page.
+
+Renders ``tasks.html`` with ``--rows`` in-memory tasks (no database
+involved) and reports the time per render:
+
+* without the row fragment cache (``TASK_ROW_CACHE_TIMEOUT=0``),
+* with an empty row cache, which renders and stores every row,
+* with every row already cached, the usual case after a write.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from core.models import Project, Task
+from webtask.cache import task_row_context
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rendering the task list with many rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def context(self, rows, updated_at):
+        owner = User(pk=1, username='owner')
+        project = Project(pk=1, owner=owner, name='Bench')
+        assignees = [User(pk=pk, username=f'user{pk}') for pk in range(2, 12)]
+        statuses = Task.TaskStatus.values
+        tasks = [
+            Task(pk=pk, project=project, title=f'Tarea {pk}',
+                 status=statuses[pk % 3], updated_at=updated_at,
+                 due_date=updated_at.date() + datetime.timedelta(days=pk % 30),
+                 assigned_to=assignees[pk % len(assignees)])
+            for pk in range(1, rows + 1)
+        ]
+        request = RequestFactory().get('/projects/1/tasks/')
+        request.user = owner
+        return request, {
+            'project': project,
+            'tasks': tasks,
+            'selected_status': '',
+            'status_labels': dict(Task.TaskStatus.choices),
+            **task_row_context(project, owner),
+        }
+
+    def time_renders(self, render, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        state = {}
+
+        def render():
+            return render_to_string(
+                'tasks.html', state['context'], state['request'])
+
+        def fresh_rows():
+            # New updated_at values keep earlier rows out of the cache.
+            state['request'], state['context'] = self.context(
+                rows, timezone.now())
+
+        def cold_renders(row_cache_timeout):
+            elapsed = 0
+            for _ in range(repeat):
+                fresh_rows()
+                state['context']['row_cache_timeout'] = row_cache_timeout
+                elapsed += self.time_renders(render, 1)
+            return elapsed / repeat
+
+        fresh_rows()
+        render()  # compile the templates into the cached loader
+        results = [
+            ('no row cache', cold_renders(0)),
+            ('row cache cold', cold_renders(settings.TASK_ROW_CACHE_TIMEOUT)),
+            ('row cache warm', self.time_renders(render, repeat)),
+        ]
+
+        self.stdout.write(f'{rows} rows, mean of {repeat} renders')
+        self.stdout.write(f'{"case":<26}{"ms":>10}')
+        for name, ms in results:
+            self.stdout.write(f'{name:<26}{ms:>10.1f}')
@@ -0,0 +1,66 @@
+"""Compare the session engines behind ``SESSION_MODE``.
+
+For every engine it logs a user in, requests ``--path`` ``--requests``
+times and logs out through the test client, and prints the queries and
+time per authenticated request, and the queries at login and logout.
+Runs in a transaction that is rolled back.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+ENGINES = {
+    mode: f'django.contrib.sessions.backends.{mode}'
+    for mode in ('db', 'cached_db', 'cache', 'signed_cookies')
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark queries and time per request for each session mode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/projects/')
+        parser.add_argument('--requests', type=int, default=200)
+
+    def measure(self, user, path, requests):
+        # Count each block as it ends: the next request resets the query
+        # log that CaptureQueriesContext reads from.
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            client.force_login(user)
+        login = len(queries)
+        client.get(path)  # warm caches
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = client.get(path)
+            elapsed = time.perf_counter() - start
+        per_request = len(queries) / requests
+        if response.status_code != 200:
+            raise CommandError(f'{path} answered {response.status_code}.')
+        with CaptureQueriesContext(connection) as queries:
+            client.logout()
+        return per_request, elapsed * 1000 / requests, login, len(queries)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"mode":<16}{"queries/req":>12}{"ms/req":>9}{"login q":>9}'
+            f'{"logout q":>10}')
+        with transaction.atomic():
+            user = User.objects.create_user('bench-sessions')
+            for mode, engine in ENGINES.items():
+                with override_settings(
+                        SESSION_ENGINE=engine, PAGE_CACHE_TIMEOUT=0,
+                        ALLOWED_HOSTS=['testserver']):
+                    queries, ms, login, logout = self.measure(
+                        user, options['path'], options['requests'])
+                current = ' *' if engine == settings.SESSION_ENGINE else ''
+                self.stdout.write(
+                    f'{mode + current:<16}{queries:>12.1f}{ms:>9.2f}'
+                    f'{login:>9}{logout:>10}')
+            transaction.set_rollback(True)
@@ -0,0 +1,185 @@
+"""Benchmark every page of ``webtask.urls`` against a JSON baseline.
+
+Each route is requested ``--repeat`` times through the Django test client
+as the owner of the largest project (or ``--username``), with the page
+and dashboard caches off unless ``--page-cache``. Latency percentiles and
+the query count of every route are printed and compared with
+``--baseline``::
+
+    python manage.py seed_bench
+    python manage.py bench_urls --save        # record bench_urls.json
+    python manage.py bench_urls               # compare, fail on regression
+
+A route regresses when its query count grows, or when its p95 latency is
+more than ``--threshold`` above the baseline and at least ``--min-delta``
+milliseconds slower. Writes done by the benchmarked views are rolled back.
+"""
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Project
+from webtask import urls
+
+# Routes that cannot be timed as a plain request, with the reason.
+SKIPPED = {
+    'logout': 'ends the benchmark session',
+    'task_events': 'an endless event stream that needs ASGI',
+    'project_restore': 'only answers for a project in the trash',
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def route_requests(project):
+    """(name, method, path, data) for every route of ``webtask.urls``.
+
+    Routes in ``SKIPPED`` are left out; ``project`` needs at least a task.
+    """
+    task = project.tasks.order_by('pk').first()
+    kwargs = {
+        'project_id': project.pk, 'pk': task.pk,
+        'new_status': task.status,
+    }
+    data = {
+        'search': {'q': task.title.split()[0]},
+        'assignee_search': {'q': project.owner.username[:3]},
+        'task_export': {'project': project.pk},
+    }
+    post_data = {
+        'task_bulk_change_status': {'status': task.status,
+                                    'ids': [task.pk]},
+    }
+    for pattern in urls.urlpatterns:
+        name = pattern.name
+        if name in SKIPPED:
+            continue
+        wanted = pattern.pattern.converters
+        route_kwargs = {key: kwargs[key] for key in wanted}
+        if name in ('project_edit', 'project_delete'):
+            route_kwargs['pk'] = project.pk
+        path = reverse(name, kwargs=route_kwargs)
+        if name in post_data:
+            yield name, 'post', path, post_data[name]
+        else:
+            yield name, 'get', path, data.get(name, {})
+
+
+class Command(BaseCommand):
+    help = 'Time every webtask URL and compare with a JSON baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--baseline', default='bench_urls.json')
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Write the results as the new baseline.')
+        parser.add_argument('--threshold', type=float, default=0.25)
+        parser.add_argument('--min-delta', type=float, default=2.0)
+        parser.add_argument('--page-cache', action='store_true')
+
+    def handle(self, *args, **options):
+        project = self.bench_project(options['username'])
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['page_cache']:
+            overrides['PAGE_CACHE_TIMEOUT'] = 0
+            overrides['DASHBOARD_CACHE_TIMEOUT'] = 0
+        with override_settings(**overrides), transaction.atomic():
+            results = self.run(project, options)
+            transaction.set_rollback(True)
+        self.report(results)
+        path = Path(options['baseline'])
+        if options['save']:
+            path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(f'Baseline written to {path}.')
+        elif path.exists():
+            self.compare(results, json.loads(path.read_text()), options)
+        else:
+            self.stdout.write(f'No baseline at {path}; pass --save.')
+
+    def bench_project(self, username):
+        projects = Project.objects.annotate(
+            tasks_count=models.Count('tasks')).order_by('-tasks_count', 'pk')
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {username!r}.')
+            projects = projects.filter(owner=user)
+        project = projects.select_related('owner').first()
+        if project is None or not project.tasks_count:
+            raise CommandError('No project with tasks; run seed_bench.')
+        return project
+
+    def run(self, project, options):
+        client = Client()
+        client.force_login(project.owner)
+        results = {}
+        for name, method, path, data in route_requests(project):
+            latencies = []
+            for i in range(options['warmup'] + options['repeat']):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(path, data)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = (time.perf_counter() - start) * 1000
+                if i >= options['warmup']:
+                    latencies.append(elapsed)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{name} ({method.upper()} {path}) answered '
+                    f'{response.status_code}.')
+            results[name] = {
+                'p50': round(percentile(latencies, 0.50), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+                'queries': len(queries),
+            }
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"route":<26}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+            f'{"queries":>9}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<26}{result["p50"]:>9.2f}{result["p95"]:>9.2f}'
+                f'{result["p99"]:>9.2f}{result["queries"]:>9}')
+        for name, reason in SKIPPED.items():
+            self.stdout.write(f'{name:<26}skipped: {reason}')
+
+    def compare(self, results, baseline, options):
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result['queries'] > before['queries']:
+                regressions.append(
+                    f'{name}: {before["queries"]} -> {result["queries"]} '
+                    f'queries')
+            slower = result['p95'] - before['p95']
+            if (slower > options['min_delta']
+                    and result['p95'] > before['p95'] * (
+                        1 + options['threshold'])):
+                regressions.append(
+                    f'{name}: p95 {before["p95"]:.2f} -> '
+                    f'{result["p95"]:.2f} ms')
+        if regressions:
+            raise CommandError(
+                'Regressions against the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(
+            'No regressions against the baseline.'))
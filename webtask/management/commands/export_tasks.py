@@ -0,0 +1,55 @@
+"""Export tasks as CSV or NDJSON, streaming them from the database.
+
+    python manage.py export_tasks --format ndjson --status pending \\
+        --from 2026-01-01 --output pending.ndjson
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Task
+from webtask.export import export_chunks, filter_tasks
+from webtask.forms import TaskExportForm
+
+
+class Command(BaseCommand):
+    help = 'Stream tasks as CSV or NDJSON to stdout or a file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--project', type=int)
+        parser.add_argument('--status')
+        parser.add_argument('--assignee', type=int, help='User id.')
+        parser.add_argument('--from', dest='created_from',
+                            help='Created on or after this date.')
+        parser.add_argument('--to', dest='created_to',
+                            help='Created on or before this date.')
+        parser.add_argument(
+            '--user', help='Only tasks visible to this username.')
+        parser.add_argument('--output', help='File path (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        form = TaskExportForm({
+            name: options[name] for name in (
+                'format', 'project', 'status', 'assignee', 'created_from',
+                'created_to') if options[name] is not None})
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        tasks = Task.objects.all()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]!r}.')
+            tasks = tasks.visible_to(user)
+        chunks = export_chunks(
+            filter_tasks(tasks, **form.filters()), options['format'],
+            options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
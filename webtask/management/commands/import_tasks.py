@@ -0,0 +1,61 @@
+"""Import tasks from a CSV or NDJSON file (see ``webtask.importer``).
+
+    python manage.py import_tasks tasks.csv --owner ana --batch-size 1000
+"""
+import csv
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from webtask.importer import FORMATS, guess_format, import_tasks, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create tasks from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--owner', help='Only accept projects owned by this username.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate every row without writing anything.')
+        parser.add_argument(
+            '--max-errors', type=int, default=50,
+            help='Rejected rows listed in the output.')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["owner"]!r}.')
+        format = options['format'] or guess_format(options['path'])
+        start = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig',
+                      newline='') as lines:
+                result = import_tasks(
+                    read_rows(lines, format), owner=owner,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'])
+        except OSError as exc:
+            raise CommandError(exc)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Batches before the unreadable line are already created.
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+        elapsed = time.perf_counter() - start
+
+        for line, errors in result.errors[:options['max_errors']]:
+            self.stderr.write(f'line {line}: ' + '; '.join(
+                f'{field}: {" ".join(messages)}'
+                for field, messages in errors.items()))
+        rows = result.created + len(result.errors)
+        verb = 'Validated' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} task(s), rejected {len(result.errors)} '
+            f'row(s) in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s).'))
@@ -0,0 +1,168 @@
+"""Fixed-concurrency HTTP load test for the webtask pages.
+
+With ``--compare`` it starts gunicorn (WSGI, sync views) and uvicorn (ASGI,
+``ASYNC_VIEWS=1``) in turn on the configured database, drives the same
+page through each and prints throughput and latency percentiles::
+
+    python manage.py loadtest --compare --username ana --path /projects/
+
+Without ``--compare`` it targets an already running server (``--url``).
+The user's session is created directly in the session store, so the
+database must be the one the servers use.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+
+async def fetch(host, port, request):
+    """Send one request on a new connection; return (status, seconds)."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(request)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    status = int(data.split(b' ', 2)[1]) if data else 0
+    return status, time.perf_counter() - start
+
+
+async def run_load(url, cookie, requests, concurrency):
+    parts = urlsplit(url)
+    request = (
+        f'GET {parts.path or "/"}{"?" + parts.query if parts.query else ""}'
+        f' HTTP/1.1\r\nHost: {parts.hostname}\r\n'
+        f'Cookie: {cookie}\r\nConnection: close\r\n\r\n').encode()
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            try:
+                status, seconds = await fetch(
+                    parts.hostname, parts.port or 80, request)
+            except OSError:
+                status, seconds = 0, 0
+            if 200 <= status < 400:
+                latencies.append(seconds)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0
+        return latencies[min(len(latencies) - 1,
+                             int(len(latencies) * p))] * 1000
+
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(0.50),
+        'p99': percentile(0.99),
+        'errors': errors,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server on port {port} did not start.')
+
+
+class Command(BaseCommand):
+    help = 'Load-test a page at fixed concurrency (gunicorn vs uvicorn).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--path', default='/projects/')
+        parser.add_argument('--url', help='Base URL of a running server.')
+        parser.add_argument('--compare', action='store_true')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--workers', type=int, default=2)
+
+    def session_cookie(self, username):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'No user named {username!r}.')
+        session = import_string(settings.SESSION_ENGINE + '.SessionStore')()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+    def servers(self, workers):
+        port = free_port()
+        yield 'gunicorn-sync', port, [
+            sys.executable, '-m', 'gunicorn', 'teamtaskmanagement.wsgi',
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+        ], {'ASYNC_VIEWS': '0'}
+        port = free_port()
+        yield 'uvicorn-async', port, [
+            sys.executable, '-m', 'uvicorn', 'teamtaskmanagement.asgi:application',
+            '--workers', str(workers), '--port', str(port), '--log-level',
+            'warning',
+        ], {'ASYNC_VIEWS': '1'}
+
+    def handle(self, *args, **options):
+        cookie = self.session_cookie(options['username'])
+        targets = []
+        if options['compare']:
+            for name, port, command, env in self.servers(options['workers']):
+                server = subprocess.Popen(
+                    command, env={**os.environ, **env},
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    wait_for_port(port)
+                    targets.append((name, asyncio.run(run_load(
+                        f'http://127.0.0.1:{port}{options["path"]}', cookie,
+                        options['requests'], options['concurrency']))))
+                finally:
+                    server.terminate()
+                    server.wait()
+        elif options['url']:
+            targets.append((options['url'], asyncio.run(run_load(
+                options['url'].rstrip('/') + options['path'], cookie,
+                options['requests'], options['concurrency']))))
+        else:
+            raise CommandError('Pass --compare or --url.')
+        self.stdout.write(
+            f'{"server":<16}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}'
+            f'{"errors":>8}')
+        for name, result in targets:
+            self.stdout.write(
+                f'{name:<16}{result["throughput"]:>10.1f}'
+                f'{result["p50"]:>10.2f}{result["p99"]:>10.2f}'
+                f'{result["errors"]:>8}')
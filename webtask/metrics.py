@@ -0,0 +1,115 @@
+"""In-process request metrics in the Prometheus text format.
+
+``PerformanceMiddleware`` feeds one observation per request into per-route
+histograms; ``MetricsView`` renders them together with the page cache
+counters. Each process keeps its own numbers, so scrape every worker (or
+run a single one) to get the whole picture.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views import View
+
+from .cache import page_cache_stats
+
+# name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'webtask_request_duration_seconds': (
+        'Wall time of the request.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    'webtask_request_db_queries': (
+        'Database queries per request.',
+        (0, 1, 2, 5, 10, 20, 50, 100, 200)),
+    'webtask_request_db_seconds': (
+        'Time spent in database queries per request.',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)),
+    'webtask_request_template_seconds': (
+        'Time spent rendering templates per request.',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)),
+    'webtask_response_size_bytes': (
+        'Size of non-streaming response bodies.',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(dict)
+
+    def observe(self, labels, values):
+        """Record ``values`` (histogram name -> value) under ``labels``."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            for name, value in values.items():
+                histogram = self._histograms[name].get(key)
+                if histogram is None:
+                    histogram = self._histograms[name][key] = Histogram(
+                        HISTOGRAMS[name][1])
+                histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}',
+                          f'# TYPE {name} histogram']
+                for key, histogram in sorted(self._histograms[name].items()):
+                    labels = ','.join(f'{k}="{escape(v)}"' for k, v in key)
+                    cumulative = 0
+                    for bound, count in zip(
+                            buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} '
+                            f'{cumulative}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{labels}}} {histogram.count}')
+        lines += ['# HELP webtask_page_cache_total Page cache lookups.',
+                  '# TYPE webtask_page_cache_total counter']
+        for view_name, outcomes in sorted(page_cache_stats().items()):
+            for outcome, count in sorted(outcomes.items()):
+                lines.append(
+                    f'webtask_page_cache_total{{view="{view_name}",'
+                    f'outcome="{outcome}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = Registry()
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint, for staff or ``METRICS_ALLOWED_IPS``."""
+
+    def get(self, request):
+        if not (request.user.is_staff or request.META.get('REMOTE_ADDR')
+                in settings.METRICS_ALLOWED_IPS):
+            return HttpResponseForbidden()
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8')
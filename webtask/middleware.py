@@ -0,0 +1,205 @@
+"""Per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures wall time, database queries and time
+(through ``connection.execute_wrapper``), template rendering time
+(through the ``webtask.template_backend`` template backend) and response
+size of every request. It reports them in a ``Server-Timing``
+header, records them in the per-route histograms of ``webtask.metrics``
+and logs requests over ``PERF_BUDGET_QUERIES`` or ``PERF_BUDGET_MS`` to
+the ``webtask.performance`` logger.
+
+Place it first in ``MIDDLEWARE`` so the other middleware is measured too.
+
+``ActorMiddleware`` attributes the task events written while handling a
+request to the requesting user (see ``core.history``); it goes after
+``AuthenticationMiddleware``.
+
+``ReplicaPinMiddleware`` opens the ``core.routers`` routing scope of each
+request: safe requests may read from a replica, unless the client wrote
+within the last ``REPLICA_PIN_SECONDS``, which a cookie remembers. It goes
+before ``SessionMiddleware`` so that session writes pin too.
+"""
+import contextvars
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from core.history import acting_as
+from core.routers import routing_scope
+
+from .metrics import registry
+
+logger = logging.getLogger('webtask.performance')
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def timing_templates():
+    """Count the time spent in this block as template time of the request."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_time += time.perf_counter() - start
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with self.wrap_connections(stats):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        # Async views reach the ORM through sync_to_async, which runs on
+        # this request's thread-sensitive thread: wrap its connections.
+        wrappers = await sync_to_async(self.enter_wrappers)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def wrap_connections(self, stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats.record_query))
+        return stack
+
+    def enter_wrappers(self, stats):
+        with self.wrap_connections(stats) as stack:
+            return stack.pop_all()
+
+    def finish(self, request, response, stats, start):
+        duration = time.perf_counter() - start
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join([
+            f'app;dur={duration * 1000:.1f}',
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} '
+            f'queries"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+        ])
+        match = request.resolver_match
+        route = (match.view_name or match.route) if match else 'unmatched'
+        values = {
+            'webtask_request_duration_seconds': duration,
+            'webtask_request_db_queries': stats.queries,
+            'webtask_request_db_seconds': stats.db_time,
+            'webtask_request_template_seconds': stats.template_time,
+        }
+        if size is not None:
+            values['webtask_response_size_bytes'] = size
+        registry.observe({'route': route, 'method': request.method}, values)
+        if (stats.queries > settings.PERF_BUDGET_QUERIES
+                or duration * 1000 > settings.PERF_BUDGET_MS):
+            logger.warning(
+                'Over budget: %s %s (%s) took %.0f ms with %d queries '
+                '(%.0f ms in the database)', request.method,
+                request.get_full_path(), route, duration * 1000,
+                stats.queries, stats.db_time * 1000)
+        return response
+
+
+class ActorMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with acting_as(request.user):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so ORM writes see the actor.
+        with acting_as(request.user):
+            return await self.get_response(request)
+
+
+class ReplicaPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    cookie_name = 'primary_pin'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_scope(self.is_pinned(request)) as scope:
+            response = self.get_response(request)
+        return self.finish(request, response, scope)
+
+    async def __acall__(self, request):
+        # The scope object is shared with the sync_to_async threads, so
+        # the writes they make are seen here.
+        with routing_scope(self.is_pinned(request)) as scope:
+            response = await self.get_response(request)
+        return self.finish(request, response, scope)
+
+    def is_pinned(self, request):
+        # Unsafe requests read what they are about to change from the
+        # primary.
+        return (request.method not in self.safe_methods
+                or self.cookie_name in request.COOKIES)
+
+    def finish(self, request, response, scope):
+        if scope.wrote:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                secure=request.is_secure(), httponly=True, samesite='Lax')
+        return response
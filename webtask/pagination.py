@@ -0,0 +1,166 @@
+"""Keyset (cursor) pagination.
+
+Instead of ``OFFSET`` the next page is selected with a ``WHERE`` on the
+ordering keys of the last row already shown, so every page costs the same
+no matter how deep the reader has scrolled. Ordering keys must be
+non-nullable and the last one must be unique (usually ``id``).
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(ValueError):
+    """The cursor could not be decoded."""
+
+
+def encode_cursor(values):
+    """Encode a list of ordering values into an opaque URL-safe token."""
+    payload = [
+        value.isoformat() if isinstance(
+            value, (datetime.date, datetime.datetime)) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a token produced by ``encode_cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+class KeysetPage:
+    """One page of results plus the cursor of the following page."""
+
+    def __init__(self, object_list, next_cursor=None, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _after(ordering, values):
+    """Build the ``WHERE`` clause selecting rows after ``values``."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def _ordering_field(queryset, name):
+    """The model field or annotation output field ordered by ``name``."""
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    opts = queryset.model._meta
+    return opts.pk if name == 'pk' else opts.get_field(name)
+
+
+def _cursor_values(queryset, cursor, ordering):
+    """Decode ``cursor`` into values of the types of the ordering fields."""
+    values = decode_cursor(cursor)
+    if len(values) != len(ordering):
+        raise InvalidCursor(cursor)
+    converted = []
+    for field, value in zip(ordering, values):
+        output_field = _ordering_field(queryset, field.lstrip('-'))
+        try:
+            value = output_field.to_python(value)
+            if value is None:
+                raise ValidationError('Ordering keys are never null.')
+            # Includes the database's range of integer columns.
+            output_field.run_validators(value)
+        except (ValidationError, TypeError, ValueError) as exc:
+            raise InvalidCursor(cursor) from exc
+        converted.append(value)
+    return converted
+
+
+def _page_queryset(queryset, cursor, per_page, ordering):
+    if cursor:
+        values = _cursor_values(queryset, cursor, ordering)
+        queryset = queryset.filter(_after(ordering, values))
+    return queryset.order_by(*ordering)[:per_page + 1]
+
+
+def _make_page(rows, cursor, per_page, ordering):
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        if isinstance(last, dict):
+            # .values() querysets yield dicts.
+            values = [last[field.lstrip('-')] for field in ordering]
+        else:
+            values = [getattr(last, field.lstrip('-')) for field in ordering]
+        next_cursor = encode_cursor(values)
+    return KeysetPage(rows, next_cursor=next_cursor, cursor=cursor or None)
+
+
+def paginate_keyset(queryset, cursor=None, per_page=50,
+                    ordering=('created_at', 'id')):
+    """Return a ``KeysetPage`` of ``queryset`` starting after ``cursor``.
+
+    A single query is issued: ``per_page + 1`` rows are fetched to find out
+    whether a next page exists. A cursor that cannot be decoded into values
+    of the ordering fields raises ``InvalidCursor``.
+    """
+    rows = list(_page_queryset(queryset, cursor, per_page, ordering))
+    return _make_page(rows, cursor, per_page, ordering)
+
+
+async def apaginate_keyset(queryset, cursor=None, per_page=50,
+                           ordering=('created_at', 'id')):
+    """Async version of ``paginate_keyset``."""
+    page_queryset = _page_queryset(queryset, cursor, per_page, ordering)
+    rows = [row async for row in page_queryset.aiterator()]
+    return _make_page(rows, cursor, per_page, ordering)
+
+
+class KeysetPaginationMixin:
+    """``MultipleObjectMixin`` plug-in that swaps page numbers for cursors.
+
+    The current cursor is read from the ``cursor`` query parameter.
+    """
+
+    cursor_kwarg = 'cursor'
+    keyset_ordering = ('created_at', 'id')
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            page = paginate_keyset(
+                queryset, cursor, page_size, self.keyset_ordering)
+        except InvalidCursor:
+            raise Http404('Cursor inválido')
+        return (None, page, page.object_list, page.has_other_pages())
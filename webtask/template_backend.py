@@ -0,0 +1,29 @@
+"""Django template backend that reports its render time.
+
+The same as Django's ``DjangoTemplates``, except that rendering a template
+counts towards the template time of the current request (see
+``webtask.middleware.PerformanceMiddleware``). Includes are rendered inside
+their parent's render, so only the templates that views, ``render()`` and
+``render_to_string()`` ask for are timed.
+"""
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+
+from .middleware import timing_templates
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        with timing_templates():
+            return super().render(context, request)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
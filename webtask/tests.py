@@ -1,3 +1,1161 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.template.base import Node
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from teamtaskmanagement.urls import urlpatterns as project_urlpatterns
+
+from core.generations import WRITTEN_KEY
+from core.models import Project, Task
+from core.routers import routing_scope
+from core.realtime import CHANNEL, get_broker
+from webtask import async_views, views
+from webtask import urls as webtask_urls
+from webtask.cache import page_cache_stats
+from webtask.forms import LoginForm
+from webtask.importer import import_tasks, read_rows
+from webtask.management.commands.bench_urls import route_requests
+from webtask.metrics import registry
+from webtask.pagination import encode_cursor
+
+# The async views mounted next to the regular ones (AsyncViewTests).
+urlpatterns = project_urlpatterns + [
+    path('async/projects/', async_views.ProjectListView.as_view(),
+         name='async_projects'),
+    path('async/projects/<int:project_id>/tasks/',
+         async_views.TaskListView.as_view(), name='async_tasks'),
+    path('async/projects/<int:project_id>/tasks/<int:pk>/',
+         async_views.TaskDetailView.as_view(), name='async_task_detail'),
+]
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class TaskListViewTests(TestCase):
+    """Keyset pagination and query count of the task list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            'owner', 'owner@example.com', 'secret')
+        cls.assignee = User.objects.create_user(
+            'assignee', 'assignee@example.com', 'secret')
+        cls.project = Project.objects.create(owner=cls.owner, name='Big')
+
+    def create_tasks(self, count):
+        Task.objects.bulk_create(
+            Task(project=self.project, title=f'Task {i}',
+                 assigned_to=self.assignee if i % 2 else None)
+            for i in range(count))
+
+    def get_tasks(self, **params):
+        return self.client.get(
+            reverse('tasks', kwargs={'project_id': self.project.pk}), params)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get_tasks()
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_depend_on_task_count(self):
+        self.client.force_login(self.owner)
+        self.create_tasks(3)
+        small = self.count_queries()
+        self.create_tasks(200)
+        large = self.count_queries()
+        self.assertEqual(small, large)
+        # session, user, task page and project.
+        with self.assertNumQueries(4):
+            self.get_tasks()
+
+    def test_cursor_walks_every_task_once(self):
+        self.client.force_login(self.owner)
+        self.create_tasks(120)
+        seen = []
+        cursor = None
+        while True:
+            response = self.get_tasks(**({'cursor': cursor} if cursor else {}))
+            page = response.context['page_obj']
+            seen.extend(task.pk for task in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(
+            seen, list(Task.objects.order_by('created_at', 'id')
+                       .values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_404(self):
+        self.client.force_login(self.owner)
+        created = '2024-01-01T00:00:00+00:00'
+        for cursor in ('not-a-cursor', 'WyJ4IiwxXQ',
+                       encode_cursor([created, 'abc']),
+                       encode_cursor([created, [1]]),
+                       encode_cursor([created, 10 ** 30]),
+                       encode_cursor([None, 1])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    self.get_tasks(cursor=cursor).status_code, 404)
+
+    def test_rows_are_cached_per_update_and_role(self):
+        cache.clear()
+        self.create_tasks(2)
+        task = Task.objects.get(title='Task 1')
+        self.client.force_login(self.owner)
+        self.assertNotContains(self.get_tasks(), 'asignada a')
+        # Writes that skip updated_at are not seen by the row cache...
+        Task.objects.filter(pk=task.pk).update(title='Renamed')
+        self.assertContains(self.get_tasks(), 'Task 1')
+        # ...and saving the task moves it to a new row key.
+        task.refresh_from_db()
+        task.save()
+        self.assertContains(self.get_tasks(), 'Renamed')
+        self.client.force_login(self.assignee)
+        response = self.get_tasks()
+        self.assertContains(response, 'asignada a assignee')
+        self.assertContains(response, 'btn-danger disabled')
+
+
+class LoginFormTests(TestCase):
+    """Email login authenticates once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'ana', 'Ana@Example.com', 'secret-password')
+
+    def test_single_lookup_and_cached_user(self):
+        form = LoginForm({
+            'email': 'ana@example.COM', 'password': 'secret-password'})
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+        with self.assertNumQueries(0):
+            self.assertEqual(form.login(), self.user)
+
+    def test_wrong_password(self):
+        form = LoginForm({'email': 'ana@example.com', 'password': 'nope'})
+        self.assertFalse(form.is_valid())
+        self.assertIsNone(form.login())
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        form = LoginForm({
+            'email': 'ana@example.com', 'password': 'secret-password'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Your account is not active.', form.non_field_errors())
+
+    def test_login_view(self):
+        response = self.client.post(reverse('login'), {
+            'email': 'ANA@example.com', 'password': 'secret-password'})
+        self.assertRedirects(response, reverse('index'))
+        self.assertEqual(
+            int(self.client.session['_auth_user_id']), self.user.pk)
+
+
+class TaskStatusViewTests(TestCase):
+    """Single and bulk status changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        cls.mine = Task.objects.create(
+            project=cls.project, title='Mine', assigned_to=cls.assignee)
+        cls.other = Task.objects.create(project=cls.project, title='Other')
+
+    def test_single_change_is_one_update(self):
+        self.client.force_login(self.assignee)
+        url = reverse('task_change_status', kwargs={
+            'project_id': self.project.pk, 'pk': self.mine.pk,
+            'new_status': 'completed'})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        updates = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('UPDATE "core_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertRegex(
+            updates[0], r'^UPDATE "core_task" SET "status" = [^,]+, '
+                        r'"updated_at" = [^,]+ WHERE')
+        self.mine.refresh_from_db()
+        self.assertEqual(self.mine.status, 'completed')
+
+    def test_bulk_change_reports_changed_tasks(self):
+        self.client.force_login(self.assignee)
+        response = self.client.post(
+            reverse('task_bulk_change_status',
+                    kwargs={'project_id': self.project.pk}),
+            {'status': 'in_progress', 'ids': [self.mine.pk, self.other.pk]},
+            follow=True)
+        self.assertContains(response, '1 tarea(s) actualizada(s).')
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.status, 'pending')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.in_progress_count, 1)
+        self.assertEqual(
+            Task.objects.filter(project=self.project).change_status(
+                self.owner, 'completed'), [self.mine.pk, self.other.pk])
+
+
+class TaskHistoryTests(TestCase):
+    """The change log records who changed what and pages newest first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        cls.task = Task.objects.create(
+            project=cls.project, title='T', assigned_to=cls.assignee)
+        cls.url = reverse('task_history', kwargs={
+            'project_id': cls.project.pk, 'pk': cls.task.pk})
+
+    def test_changes_are_attributed_to_the_requesting_user(self):
+        self.client.force_login(self.assignee)
+        self.client.get(reverse('task_change_status', kwargs={
+            'project_id': self.project.pk, 'pk': self.task.pk,
+            'new_status': 'completed'}))
+        response = self.client.get(self.url)
+        event = response.context['events'][0]
+        self.assertEqual(event.actor, self.assignee)
+        self.assertEqual(event.changes,
+                         [('Estado', 'Pendiente', 'Completada')])
+        self.assertContains(response, 'Creada')
+
+    def test_pages_with_a_cursor(self):
+        for i in range(3):
+            self.task.title = f'T{i}'
+            self.task.save()
+        self.client.force_login(self.owner)
+        with mock.patch.object(views.TaskHistoryView, 'paginate_by', 2):
+            first = self.client.get(self.url)
+            cursor = first.context['page_obj'].next_cursor
+            second = self.client.get(self.url, {'cursor': cursor})
+        titles = [event.diff['title'][1] for event in first.context['events']]
+        self.assertEqual(titles, ['T2', 'T1'])
+        self.assertEqual(
+            [event.diff.get('title') for event in second.context['events']],
+            [['T', 'T0'], None])
+
+    def test_hidden_from_strangers(self):
+        self.client.force_login(User.objects.create_user('stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ProjectTrashViewTests(TestCase):
+    """Deleting a project moves it to the trash, where it can be restored."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        Task.objects.create(project=cls.project, title='T')
+
+    def test_delete_and_restore(self):
+        self.client.force_login(self.owner)
+        self.client.post(reverse('project_delete', args=[self.project.pk]))
+        self.assertEqual(self.project.tasks.count(), 1)
+        self.assertNotContains(self.client.get(reverse('projects')), '>P<')
+        self.assertEqual(self.client.get(
+            reverse('tasks', args=[self.project.pk])).status_code, 404)
+        response = self.client.get(reverse('project_trash'))
+        self.assertEqual(list(response.context['projects']), [self.project])
+        self.client.post(reverse('project_restore', args=[self.project.pk]))
+        self.assertEqual(self.client.get(
+            reverse('tasks', args=[self.project.pk])).status_code, 200)
+
+    def test_no_restore_after_the_undo_window(self):
+        Project.objects.filter(pk=self.project.pk).update(
+            deleted_at=timezone.now() - datetime.timedelta(
+                days=settings.PROJECT_UNDO_DAYS + 1))
+        self.client.force_login(self.owner)
+        self.assertFalse(
+            self.client.get(reverse('project_trash')).context['projects'])
+        self.assertEqual(self.client.post(reverse(
+            'project_restore', args=[self.project.pk])).status_code, 404)
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=0)
+class DashboardTests(TestCase):
+    """The "my work" dashboard costs the same at any number of projects."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user('worker')
+        owner = User.objects.create_user('owner')
+        projects = Project.objects.bulk_create(
+            Project(owner=owner, name=f'P{i}') for i in range(1000))
+        today = timezone.localdate()
+        due_dates = (today - datetime.timedelta(days=1), today, None,
+                     today + datetime.timedelta(days=30))
+        Task.objects.bulk_create(
+            Task(project=project, title=f'T{i}', assigned_to=cls.worker,
+                 status=Task.TaskStatus.values[i % 3],
+                 due_date=due_dates[i % 4])
+            for i, project in enumerate(projects))
+        cls.trashed = projects[0]
+        cls.trashed.soft_delete()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.worker)
+
+    def test_summary(self):
+        summary = self.client.get(reverse('index')).context['summary']
+        tasks = Task.objects.filter(assigned_to=self.worker).exclude(
+            project=self.trashed)
+        open_tasks = tasks.exclude(status=Task.TaskStatus.COMPLETED)
+        today = timezone.localdate()
+        self.assertEqual(summary, {
+            'pending': tasks.filter(status='pending').count(),
+            'in_progress': tasks.filter(status='in_progress').count(),
+            'completed': tasks.filter(status='completed').count(),
+            'overdue': open_tasks.filter(due_date__lt=today).count(),
+            'today': open_tasks.filter(due_date=today).count(),
+            'week': 0,
+        })
+
+    def test_queries_at_1000_projects(self):
+        # Session, user, the summary aggregate and one page of tasks.
+        with self.assertNumQueries(4):
+            self.client.get(reverse('index'))
+        with self.settings(DASHBOARD_CACHE_TIMEOUT=30):
+            self.client.get(reverse('index'))
+            with self.assertNumQueries(3):
+                self.client.get(reverse('index'))
+
+    def test_bucket_pages(self):
+        first = self.client.get(reverse('index'), {'bucket': 'today'})
+        page = first.context['page_obj']
+        second = self.client.get(
+            reverse('index'), {'bucket': 'today', 'cursor': page.next_cursor})
+        tasks = list(page) + list(second.context['page_obj'])
+        self.assertEqual(len(tasks), len({task.pk for task in tasks}))
+        self.assertTrue(all(
+            task.due_date == timezone.localdate()
+            and task.status != 'completed' for task in tasks))
+        self.assertNotIn(self.trashed.pk, {task.project_id for task in tasks})
+
+    def test_invalid_cursor_is_404(self):
+        cursor = encode_cursor(['2024-01-01T00:00:00+00:00', 'abc'])
+        self.assertEqual(
+            self.client.get(reverse('index'), {'cursor': cursor}).status_code,
+            404)
+
+
+class AssigneePickerTests(TestCase):
+    """The assignee picker searches users instead of listing them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        User.objects.bulk_create(
+            User(username=f'ana{i:02}') for i in range(30))
+        cls.member = User.objects.create_user('ana99')
+        Task.objects.create(
+            project=cls.project, title='T', assigned_to=cls.member)
+        User.objects.create_user('ana-inactive', is_active=False)
+
+    def search(self, q):
+        return self.client.get(
+            reverse('assignee_search', kwargs={'project_id': self.project.pk}),
+            {'q': q})
+
+    def test_participants_first(self):
+        self.client.force_login(self.owner)
+        results = self.search('ana').json()['results']
+        self.assertEqual(
+            [user['username'] for user in results],
+            ['ana99'] + [f'ana{i:02}' for i in range(9)])
+        self.assertEqual(
+            [user['username'] for user in self.search('o').json()['results']],
+            ['owner'])
+
+    def test_only_owner_searches(self):
+        self.client.force_login(self.member)
+        self.assertEqual(self.search('ana').status_code, 404)
+
+    def test_form_does_not_list_users(self):
+        self.client.force_login(self.owner)
+        url = reverse('task_edit', kwargs={
+            'project_id': self.project.pk, 'pk': self.member.assigned_tasks
+            .get().pk})
+        response = self.client.get(url)
+        self.assertContains(response, 'value="ana99"')
+        self.assertNotContains(response, 'ana00')
+        response = self.client.post(url, {
+            'title': 'T', 'status': 'pending',
+            'assigned_to': User.objects.get(username='ana05').pk})
+        self.assertEqual(response.status_code, 302)
+        inactive = User.objects.get(username='ana-inactive')
+        response = self.client.post(url, {
+            'title': 'T', 'status': 'pending', 'assigned_to': inactive.pk})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(url, {
+            'title': 'T', 'status': 'pending', 'assigned_to': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['assigned_to'])
+
+
+class SearchTests(TestCase):
+    """Ranked, visibility-scoped full-text search."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(
+            owner=cls.owner, name='Migración', description='Nuevo servidor')
+        cls.in_title = Task.objects.create(
+            project=cls.project, title='Revisar informe')
+        cls.in_description = Task.objects.create(
+            project=cls.project, title='Reunión',
+            description='Llevar el informe impreso',
+            assigned_to=cls.assignee)
+        Task.objects.create(project=cls.project, title='Otra cosa')
+
+    def search(self, q, **params):
+        return self.client.get(reverse('search'), {'q': q, **params})
+
+    def test_title_matches_rank_first(self):
+        self.client.force_login(self.owner)
+        results = list(self.search('informe').context['results'])
+        self.assertEqual(results, [self.in_title, self.in_description])
+
+    def test_index_follows_writes(self):
+        self.client.force_login(self.owner)
+        self.in_title.title = 'Revisar presupuesto'
+        self.in_title.save()
+        Task.objects.filter(pk=self.in_description.pk).delete()
+        self.assertEqual(list(self.search('informe').context['results']), [])
+        self.assertEqual(
+            list(self.search('presupuesto').context['results']),
+            [self.in_title])
+
+    def test_visibility_and_projects(self):
+        self.client.force_login(self.assignee)
+        self.assertEqual(
+            list(self.search('informe').context['results']),
+            [self.in_description])
+        response = self.search('migracion servidor', type='projects')
+        self.assertEqual(list(response.context['results']), [self.project])
+        self.client.force_login(User.objects.create_user('stranger'))
+        self.assertEqual(
+            list(self.search('informe').context['results']), [])
+
+    def test_cursor_walks_every_match(self):
+        self.client.force_login(self.owner)
+        Task.objects.bulk_create(
+            Task(project=self.project, title=f'Informe {i}')
+            for i in range(45))
+        seen, cursor = [], ''
+        while True:
+            response = self.search('informe', cursor=cursor)
+            page = response.context['page_obj']
+            seen += [task.pk for task in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 47)
+        self.assertEqual(len(set(seen)), 47)
+        self.assertEqual(self.search('"', cursor='x').status_code, 404)
+
+
+class ExportTests(TestCase):
+    """Streaming CSV/NDJSON export."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        cls.other = Project.objects.create(owner=cls.assignee, name='Q')
+        Task.objects.create(
+            project=cls.project, title='Shared, "quoted"',
+            assigned_to=cls.assignee, status='in_progress')
+        Task.objects.create(project=cls.project, title='Private')
+        Task.objects.create(project=cls.other, title='Elsewhere')
+
+    def export(self, **params):
+        response = self.client.get(reverse('task_export'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_respects_visibility(self):
+        self.client.force_login(self.assignee)
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(
+            [row['title'] for row in rows], ['Shared, "quoted"', 'Elsewhere'])
+        self.assertEqual(rows[0]['assigned_to'], 'assignee')
+
+    def test_ndjson_filters(self):
+        self.client.force_login(self.owner)
+        lines = self.export(format='ndjson', status='in_progress',
+                            project=self.project.pk).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines],
+                         ['Shared, "quoted"'])
+        today = timezone.localdate()
+        self.assertEqual(self.export(
+            format='ndjson', created_to=today - datetime.timedelta(days=1)),
+            '')
+        self.assertEqual(
+            len(self.export(format='ndjson', created_from=today,
+                            created_to=today).splitlines()), 2)
+        response = self.client.get(reverse('task_export'), {'status': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_tasks', '--format', 'ndjson', '--user', 'owner',
+                     stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_memory_stays_flat(self):
+        self.client.force_login(self.owner)
+
+        def peak_memory(total):
+            Task.objects.bulk_create(
+                Task(project=self.project, title=f'Task {i}',
+                     description='x' * 200)
+                for i in range(total - self.project.tasks.count()))
+            response = self.client.get(reverse('task_export'))
+            tracemalloc.start()
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.assertGreater(size, total * 200)
+            return peak
+
+        small = peak_memory(2000)
+        large = peak_memory(20000)
+        # Ten times the rows must not need more than a little extra memory.
+        self.assertLess(large, small * 1.5)
+
+
+class ImportTests(TestCase):
+    """Batched CSV/NDJSON import."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        cls.foreign = Project.objects.create(owner=cls.assignee, name='Q')
+
+    def csv_file(self, rows):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, [
+            'project_id', 'title', 'status', 'due_date', 'assigned_to'])
+        writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue()
+
+    def test_queries_per_batch_not_per_row(self):
+        rows = [{'project_id': self.project.pk, 'title': f'T{i}',
+                 'status': 'in_progress', 'assigned_to': 'assignee'}
+                for i in range(250)]
+        lines = io.StringIO(self.csv_file(rows))
+        # Per batch: projects, users, then SAVEPOINT, INSERT, counters
+        # UPDATE, task events INSERT and RELEASE.
+        with self.assertNumQueries(3 * 7):
+            result = import_tasks(read_rows(lines), batch_size=100)
+        self.assertEqual((result.created, result.errors), (250, []))
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.in_progress_count, 250)
+        self.assertEqual(
+            self.project.tasks.filter(assigned_to=self.assignee).count(), 250)
+
+    def test_upload_reports_row_errors(self):
+        self.client.force_login(self.owner)
+        upload = SimpleUploadedFile('tasks.csv', self.csv_file([
+            {'project_id': self.project.pk, 'title': 'Ok',
+             'due_date': '2026-12-01'},
+            {'project_id': self.foreign.pk, 'title': 'Not mine'},
+            {'project_id': self.project.pk, 'title': '', 'status': 'x'},
+            {'project_id': self.project.pk, 'title': 'Who',
+             'assigned_to': 'nobody'},
+        ]).encode())
+        response = self.client.post(reverse('task_import'), {'file': upload})
+        self.assertContains(response, '1 tarea(s) importada(s).')
+        self.assertEqual(
+            [line for line, _ in response.context['result'].errors],
+            [3, 4, 5])
+        self.assertEqual(
+            set(response.context['result'].errors[1][1]), {'title', 'status'})
+        self.assertEqual(
+            list(self.project.tasks.values_list('title', flat=True)), ['Ok'])
+
+    def test_command_imports_an_export(self):
+        Task.objects.create(
+            project=self.project, title='Exported', assigned_to=self.assignee)
+        path = os.path.join(tempfile.mkdtemp(), 'tasks.ndjson')
+        call_command('export_tasks', '--format', 'ndjson', '--output', path)
+        with open(path, 'a') as file:
+            file.write('not json\n')
+        err = io.StringIO()
+        call_command('import_tasks', path, stdout=io.StringIO(), stderr=err)
+        self.assertIn('line 2: __all__', err.getvalue())
+        self.assertEqual(self.project.tasks.filter(
+            title='Exported', assigned_to=self.assignee).count(), 2)
+
+    def test_unreadable_files_are_rejected(self):
+        self.client.force_login(self.owner)
+        header = b'project_id,title\n'
+        row = f'{self.project.pk},'.encode()
+        for content, message in (
+                (header + row + 'Café\n'.encode('latin-1'),
+                 'no está codificado en UTF-8'),
+                (header + row + b'x' * 200000 + b'\n', 'CSV mal formado')):
+            upload = SimpleUploadedFile('tasks.csv', content)
+            response = self.client.post(
+                reverse('task_import'), {'file': upload})
+            self.assertContains(response, message)
+        self.assertEqual(self.project.tasks.count(), 0)
+        path = os.path.join(tempfile.mkdtemp(), 'tasks.csv')
+        with open(path, 'wb') as file:
+            file.write(header + row + 'Café\n'.encode('latin-1'))
+        with self.assertRaisesMessage(CommandError, 'Cannot read'):
+            call_command('import_tasks', path, stdout=io.StringIO())
+
+
+class PageCacheTests(TestCase):
+    """Cached project and task pages are invalidated by writes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        cls.task = Task.objects.create(
+            project=cls.project, title='First', assigned_to=cls.assignee)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+        self.tasks_url = reverse(
+            'tasks', kwargs={'project_id': self.project.pk})
+
+    def test_hit_after_miss(self):
+        hits = page_cache_stats().get('TaskListView', {}).get('hit', 0)
+        self.client.get(self.tasks_url)
+        with self.assertNumQueries(2):  # session and user
+            response = self.client.get(self.tasks_url)
+        self.assertContains(response, 'First')
+        self.assertEqual(page_cache_stats()['TaskListView']['hit'], hits + 1)
+
+    def test_task_writes_invalidate(self):
+        self.client.get(self.tasks_url)
+        self.task.title = 'Renamed'
+        self.task.save()
+        self.assertContains(self.client.get(self.tasks_url), 'Renamed')
+        Task.objects.filter(pk=self.task.pk).change_status(
+            self.owner, 'completed')
+        self.assertContains(self.client.get(self.tasks_url), 'Completada')
+
+    def test_project_list_follows_visibility(self):
+        self.client.force_login(self.assignee)
+        projects_url = reverse('projects')
+        self.assertContains(self.client.get(projects_url), 'P</h5>')
+        self.task.delete()
+        self.assertNotContains(self.client.get(projects_url), 'P</h5>')
+
+    def test_pages_are_per_user(self):
+        self.client.get(self.tasks_url)
+        self.client.force_login(self.assignee)
+        response = self.client.get(self.tasks_url)
+        self.assertContains(response, 'asignada a assignee')
+
+
+@override_settings(ROOT_URLCONF=__name__, PAGE_CACHE_TIMEOUT=0)
+class AsyncViewTests(TestCase):
+    """The async views render the same pages as the sync ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.stranger = User.objects.create_user('stranger')
+        cls.project = Project.objects.create(owner=cls.owner, name='Async')
+        cls.task = Task.objects.create(
+            project=cls.project, title='Visible', assigned_to=cls.assignee)
+        Task.objects.create(project=cls.project, title='Hidden')
+
+    async def test_project_list(self):
+        response = await self.async_client.get(reverse('async_projects'))
+        self.assertEqual(response.status_code, 302)
+        await self.async_client.aforce_login(self.assignee)
+        response = await self.async_client.get(reverse('async_projects'))
+        self.assertContains(response, 'Async')
+
+    async def test_task_list(self):
+        url = reverse('async_tasks', kwargs={'project_id': self.project.pk})
+        await self.async_client.aforce_login(self.assignee)
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Visible')
+        self.assertNotContains(response, 'Hidden')
+        await self.async_client.aforce_login(self.stranger)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_task_detail(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(reverse(
+            'async_task_detail',
+            kwargs={'project_id': self.project.pk, 'pk': self.task.pk}))
+        self.assertContains(response, 'assignee')
+
+
+class RealtimeTests(TestCase):
+    """Task deltas are pushed to open boards over Server-Sent Events."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.project = Project.objects.create(owner=cls.owner, name='Live')
+        cls.task = Task.objects.create(
+            project=cls.project, title='Mine', assigned_to=cls.assignee)
+        cls.other = Task.objects.create(project=cls.project, title='Other')
+
+    def test_deltas_are_published_on_commit(self):
+        channel = CHANNEL % self.project.pk
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.filter(pk=self.task.pk).change_status(
+                    self.owner, 'completed')
+                publish.assert_not_called()
+            publish.assert_called_once_with(channel, {'tasks': [{
+                'id': self.task.pk, 'project_id': self.project.pk,
+                'assigned_to_id': self.assignee.pk, 'status': 'completed'}]})
+            with self.captureOnCommitCallbacks(execute=True):
+                self.other.title = 'Renamed'
+                self.other.save()
+                Task.objects.filter(pk=self.task.pk).delete()
+        self.assertEqual(publish.call_args_list[1].args[1]['tasks'][0][
+            'title'], 'Renamed')
+        self.assertEqual(publish.call_args_list[2].args[1], {'tasks': [{
+            'id': self.task.pk, 'project_id': self.project.pk,
+            'assigned_to_id': self.assignee.pk, 'deleted': True}]})
+
+    async def read_event(self, stream):
+        return (await anext(stream)).decode()
+
+    async def test_stream_filters_by_assignment(self):
+        url = reverse('task_events', kwargs={'project_id': self.project.pk})
+        broker = get_broker()
+        channel = CHANNEL % self.project.pk
+        await self.async_client.aforce_login(self.assignee)
+        response = await self.async_client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await self.read_event(stream), 'retry: 3000\n\n')
+        broker.publish(channel, {'tasks': [
+            {'id': self.other.pk, 'assigned_to_id': None, 'status': 'x'}]})
+        broker.publish(channel, {'tasks': [
+            {'id': self.task.pk, 'assigned_to_id': self.assignee.pk,
+             'status': 'completed'}]})
+        event = await self.read_event(stream)
+        self.assertTrue(event.startswith('event: tasks\n'))
+        self.assertEqual(
+            json.loads(event.split('data: ')[1]),
+            [{'id': self.task.pk, 'assigned_to_id': self.assignee.pk,
+              'status': 'completed'}])
+        # A client disconnect cancels the task that is waiting for events.
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertNotIn(channel, broker._channels)
+
+    async def test_requires_visibility(self):
+        await self.async_client.aforce_login(
+            await User.objects.acreate(username='stranger'))
+        response = await self.async_client.get(reverse(
+            'task_events', kwargs={'project_id': self.project.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_wsgi_is_refused(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse(
+            'task_events', kwargs={'project_id': self.project.pk}))
+        self.assertEqual(response.status_code, 501)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class SessionModeTests(TestCase):
+    """The cached session engines keep django_session off the request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user')
+
+    def count_queries(self, engine):
+        with self.settings(
+                SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}'):
+            client = self.client_class()
+            client.force_login(self.user)
+            client.get(reverse('projects'))
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(reverse('projects')).status_code,
+                                 200)
+            return len(queries)
+
+    def test_session_queries(self):
+        db = self.count_queries('db')
+        for engine in ('cached_db', 'cache', 'signed_cookies'):
+            with self.subTest(engine=engine):
+                self.assertEqual(self.count_queries(engine), db - 1)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class PerformanceMiddlewareTests(TestCase):
+    """Requests are timed, exported as metrics and checked against budgets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', is_staff=True)
+        cls.project = Project.objects.create(owner=cls.owner, name='P')
+        Task.objects.create(project=cls.project, title='First')
+
+    def setUp(self):
+        registry.clear()
+        self.client.force_login(self.owner)
+        self.tasks_url = reverse(
+            'tasks', kwargs={'project_id': self.project.pk})
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.tasks_url)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ '
+                                 r'queries", tpl;dur=[\d.]+$')
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertNotEqual(timing.split('tpl;dur=')[1], '0.0')
+
+    async def test_server_timing_async(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(self.tasks_url)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.tasks_url)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE webtask_request_duration_seconds histogram', body)
+        self.assertIn('webtask_request_db_queries_count{method="GET",'
+                      'route="tasks"} 1', body)
+        self.assertIn('webtask_response_size_bytes_bucket{method="GET",'
+                      'route="tasks",le="+Inf"} 1', body)
+
+    def test_metrics_access(self):
+        self.client.logout()
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_budget_is_logged(self):
+        with self.settings(PERF_BUDGET_QUERIES=0):
+            with self.assertLogs('webtask.performance', 'WARNING') as logs:
+                self.client.get(self.tasks_url)
+        self.assertIn('Over budget: GET', logs.output[0])
+        with self.assertNoLogs('webtask.performance'):
+            self.client.get(self.tasks_url)
+
+
+class BenchUrlsTests(TestCase):
+    """``bench_urls`` times every route and catches regressions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_bench', '--users', '3', '--projects', '5',
+                     '--tasks', '50', stdout=io.StringIO())
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            args = ['bench_urls', '--repeat', '1', '--warmup', '0',
+                    '--baseline', baseline]
+            call_command(*args, '--save', stdout=io.StringIO())
+            with open(baseline) as f:
+                results = json.load(f)
+            self.assertEqual(
+                set(results),
+                {pattern.name for pattern in webtask_urls.urlpatterns}
+                - {'logout', 'task_events', 'project_restore'})
+            results['tasks']['queries'] -= 1
+            with open(baseline, 'w') as f:
+                json.dump(results, f)
+            with self.assertRaisesMessage(CommandError, 'tasks: '):
+                call_command(*args, stdout=io.StringIO())
+
+
+# Most queries each route of webtask.urls may issue per request, whatever
+# the size of the project (see QueryBudgetTests).
+QUERY_BUDGETS = {
+    'index': 4,
+    'signup': 2,
+    'login': 2,
+    'search': 3,
+    'metrics': 2,
+    'task_export': 3,
+    'task_import': 2,
+    'projects': 3,
+    'project_create': 2,
+    'project_edit': 3,
+    'project_delete': 3,
+    'project_trash': 3,
+    'tasks': 4,
+    'task_bulk_change_status': 5,
+    'assignee_search': 5,
+    'task_create': 2,
+    'task_edit': 5,
+    'task_delete': 4,
+    'task_detail': 3,
+    'task_history': 4,
+    'task_change_status': 5,
+}
+
+
+def query_origin(limit=6):
+    """Template nodes and project code on the stack, innermost first."""
+    origin = []
+    frame = sys._getframe(2)
+    while frame is not None and len(origin) < limit:
+        code = frame.f_code
+        node = frame.f_locals.get('self')
+        if code.co_name == 'render_annotated' and isinstance(node, Node):
+            if node.token is not None:
+                origin.append(
+                    f'{node.origin.template_name}:{node.token.lineno} '
+                    f'{node.token.contents}')
+        elif (code.co_filename.startswith(str(settings.BASE_DIR))
+              and code.co_filename != __file__):
+            origin.append(
+                f'{os.path.relpath(code.co_filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return origin
+
+
+class QueryRecorder:
+    """Execute wrapper keeping each query with the code that issued it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, query_origin()))
+        return execute(sql, params, many, context)
+
+    def report(self):
+        lines = []
+        for sql, origin in self.queries:
+            lines.append(sql)
+            lines += [f'    {frame}' for frame in origin]
+        return '\n'.join(lines)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0, DASHBOARD_CACHE_TIMEOUT=0)
+class QueryBudgetTests(TestCase):
+    """Every route stays within its query budget at every data size."""
+
+    SCALES = (10, 1000)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner')
+        cls.assignee = User.objects.create_user('assignee')
+        cls.other = User.objects.create_user('other')
+
+    def create_project(self, size):
+        project = Project.objects.create(owner=self.owner, name=f'{size}')
+        today = timezone.localdate()
+        Task.objects.bulk_create(
+            Task(project=project, title=f'Tarea {i}',
+                 status=Task.TaskStatus.values[i % 3],
+                 due_date=today + datetime.timedelta(days=i % 20 - 10),
+                 assigned_to=(self.assignee, self.other, None)[i % 3])
+            for i in range(size))
+        return project
+
+    def record(self, project, user):
+        """QueryRecorder of each route, requested as ``user``."""
+        self.client.force_login(user)
+        recorders = {}
+        for name, method, url, data in route_requests(project):
+            recorder = recorders[name] = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                response = getattr(self.client, method)(url, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        return recorders
+
+    def test_budgets(self):
+        self.assertEqual(
+            set(QUERY_BUDGETS),
+            {name for name, *_ in route_requests(self.create_project(1))},
+            'Declare a query budget for every route.')
+        for user in (self.owner, self.assignee):
+            runs = [self.record(self.create_project(size), user)
+                    for size in self.SCALES]
+            for name, budget in QUERY_BUDGETS.items():
+                small, large = (run[name] for run in runs)
+                with self.subTest(route=name, user=user.username):
+                    self.assertLessEqual(
+                        len(large.queries), budget,
+                        f'{name} is over its budget of {budget} queries:\n'
+                        f'{large.report()}')
+                    self.assertEqual(
+                        len(large.queries), len(small.queries),
+                        f'{name} issues more queries with '
+                        f'{self.SCALES[-1]} tasks than with '
+                        f'{self.SCALES[0]}:\n{large.report()}')
+
+    def test_report_points_at_template_line(self):
+        project = self.create_project(1)
+        task = Task.objects.get(project=project)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            render_to_string('task_detail.html', {
+                'task': task, 'project': project})
+        report = recorder.report()
+        self.assertIn('task_detail.html:8 if task.project.owner_id', report)
+        self.assertIn('task_detail.html:24 task.assigned_to.username', report)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    DATABASE_ROUTERS=['core.routers.ReplicaRouter'],
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+    PAGE_CACHE_TIMEOUT=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Safe reads use the replica, except right after the client wrote.
+
+    A second SQLite database stands in for the replica. Nothing replicates
+    to it, so each row tells which database a page was read from.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # The test runner only sets up configured databases, so the replica
+        # is attached here, and migrated before the router is installed.
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {
+            **connections.settings['default'],
+            'NAME': os.path.join(cls.directory.name, 'replica.sqlite3')}
+        call_command('migrate', database='replica', verbosity=0)
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del cls.databases
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.project = Project.objects.create(
+            owner=self.owner, name='Primaria')
+        User.objects.using('replica').create(
+            pk=self.owner.pk, username='owner', password=self.owner.password)
+        Project.objects.using('replica').create(
+            pk=self.project.pk, owner_id=self.owner.pk, name='Réplica')
+        self.client.force_login(self.owner)
+
+    def tearDown(self):
+        Project.objects.using('replica').all().delete()
+        User.objects.using('replica').all().delete()
+        cache.clear()
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        self.assertContains(self.client.get(reverse('projects')), 'Réplica')
+        response = self.client.post(
+            reverse('project_edit', args=[self.project.pk]),
+            {'name': 'Primaria 2', 'description': ''})
+        self.assertEqual(
+            response.cookies['primary_pin']['max-age'],
+            settings.REPLICA_PIN_SECONDS)
+        self.assertContains(self.client.get(reverse('projects')), 'Primaria 2')
+        # Once the cookie expires the replica serves the reads again.
+        del self.client.cookies['primary_pin']
+        self.assertContains(self.client.get(reverse('projects')), 'Réplica')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=300)
+    def test_replica_pages_are_cached_once_the_replica_caught_up(self):
+        url = reverse('projects')
+        # The project was just written, so the replica may still lag.
+        self.assertContains(self.client.get(url), 'Réplica')
+        Project.objects.using('replica').update(name='Réplica 2')
+        self.assertContains(self.client.get(url), 'Réplica 2')
+        # REPLICA_PIN_SECONDS later, its replica pages are cached.
+        cache.delete(WRITTEN_KEY % self.project.pk)
+        self.assertContains(self.client.get(url), 'Réplica 2')
+        Project.objects.using('replica').update(name='Réplica 3')
+        self.assertContains(self.client.get(url), 'Réplica 2')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=300)
+    def test_primary_pages_are_cached(self):
+        url = reverse('projects')
+        self.client.cookies['primary_pin'] = '1'
+        self.assertContains(self.client.get(url), 'Primaria')
+        del self.client.cookies['primary_pin']
+        self.assertContains(self.client.get(url), 'Primaria')
+
+    def test_status_link_writes_in_one_transaction_on_the_primary(self):
+        task = Task.objects.create(project=self.project, title='T')
+        url = reverse('task_change_status', args=[
+            self.project.pk, task.pk, Task.TaskStatus.COMPLETED])
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.get(url)
+        # The rows are locked, written and logged in a single transaction.
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual((sql[0], sql[-1], sql.count('BEGIN')),
+                         ('BEGIN', 'COMMIT', 1))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.TaskStatus.COMPLETED)
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.project.pending_count, self.project.completed_count),
+            (0, 1))
+
+    def test_routing(self):
+        self.assertEqual(Project.objects.all().db, 'default')
+        with routing_scope() as scope:
+            self.assertEqual(Project.objects.all().db, 'replica')
+            with transaction.atomic():
+                self.assertEqual(Project.objects.all().db, 'default')
+            self.assertFalse(scope.wrote)
+            Project.objects.filter(pk=self.project.pk).update(name='P')
+            self.assertTrue(scope.wrote)
+            self.assertEqual(Project.objects.all().db, 'default')
+        with routing_scope(pinned=True):
+            self.assertEqual(Project.objects.all().db, 'default')
@@ -1,6 +1,10 @@
 """Core Urls."""
+from django.conf import settings
 from django.urls import path
-from webtask import views
+from webtask import async_views, metrics, views
+
+# Async variants of the read-heavy pages, for ASGI deployments.
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 
 urlpatterns = [
@@ -8,16 +12,33 @@ urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
     path('login/', views.Login.as_view(), name='login'),
     path('logout', views.LogoutView.as_view(), name='logout'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('metrics/', metrics.MetricsView.as_view(), name='metrics'),
+    path('export/tasks/',
+         views.TaskExportView.as_view(), name='task_export'),
+    path('import/tasks/',
+         views.TaskImportView.as_view(), name='task_import'),
     path('projects/',
-         views.ProjectListView.as_view(), name='projects'),
+         read_views.ProjectListView.as_view(), name='projects'),
     path('projects/new/',
          views.ProjectCreateView.as_view(), name='project_create'),
     path('projects/<int:pk>/edit/',
          views.ProjectUpdateView.as_view(), name='project_edit'),
     path('projects/<int:pk>/delete/',
          views.ProjectDeleteView.as_view(), name='project_delete'),
+    path('projects/<int:pk>/restore/',
+         views.ProjectRestoreView.as_view(), name='project_restore'),
+    path('projects/trash/',
+         views.ProjectTrashView.as_view(), name='project_trash'),
     path('projects/<int:project_id>/tasks/',
-         views.TaskListView.as_view(), name='tasks'),
+         read_views.TaskListView.as_view(), name='tasks'),
+    path('projects/<int:project_id>/events/',
+         async_views.TaskEventsView.as_view(), name='task_events'),
+    path('projects/<int:project_id>/tasks/status/',
+         views.TaskBulkChangeStatusView.as_view(),
+         name='task_bulk_change_status'),
+    path('projects/<int:project_id>/assignees/',
+         views.AssigneeSearchView.as_view(), name='assignee_search'),
     path('projects/<int:project_id>/tasks/new/',
          views.TaskCreateView.as_view(), name='task_create'),
     path('projects/<int:project_id>/tasks/<int:pk>/edit/',
@@ -25,7 +46,9 @@ urlpatterns = [
     path('projects/<int:project_id>/tasks/<int:pk>/delete/',
          views.TaskDeleteView.as_view(), name='task_delete'),
     path('projects/<int:project_id>/tasks/<int:pk>/detail/',
-         views.TaskDetailView.as_view(), name='task_detail'),
+         read_views.TaskDetailView.as_view(), name='task_detail'),
+    path('projects/<int:project_id>/tasks/<int:pk>/history/',
+         views.TaskHistoryView.as_view(), name='task_history'),
     path('projects/<int:project_id>/tasks/<int:pk>/status/<str:new_status>/',
          views.TaskChangeStatusView.as_view(),
          name='task_change_status'),
@@ -1,21 +1,38 @@
 # from django import forms
+import csv
+import datetime
+import io
+
 from django.shortcuts import get_object_or_404, redirect, render, Http404
 from django.views import View
 from django.contrib.auth import login, logout
-from core.models import Project, Task
+from django.contrib.auth.models import User
+from django.db import transaction
+from core.models import Project, Task, TaskEvent, due_buckets
+from core.search import SEARCH_ORDERING, search_projects, search_tasks
 from webtask import forms
 from django.views.generic import FormView, CreateView, UpdateView, DeleteView
 from django.views.generic import DetailView
 from django.urls import reverse_lazy
 from django.contrib import messages
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.http import StreamingHttpResponse
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .forms import ProjectForm, TaskForm
-from django.db.models import Q
+from .cache import CachedPageMixin, task_row_context, work_summary
+from .export import CONTENT_TYPES, export_chunks, filter_tasks
+from .forms import ProjectForm, TaskExportForm, TaskForm, TaskImportForm
+from .importer import guess_format, import_tasks, read_rows
+from .pagination import InvalidCursor, KeysetPaginationMixin
+from .pagination import paginate_keyset
 
 
 class Index(View):
+    """Home page; signed-in users get the "my work" dashboard."""
+
     template_name = "index.html"
+    paginate_by = 20
+    keyset_ordering = ('created_at', 'id')
 
     def get(self, request, *args, **kwargs):
         """Lógica para manejar el método GET."""
@@ -23,8 +40,39 @@ class Index(View):
         ctx = {
             'user': user,
         }
+        if user.is_authenticated:
+            ctx.update(self.get_dashboard_context())
         return render(request, self.template_name, ctx)
 
+    def get_dashboard_context(self):
+        """Figures across all projects plus a page of the open tasks.
+
+        The figures come from one cached aggregate query; the open tasks,
+        optionally limited to one due-date bucket, are paged on
+        ``task_assignee_open_idx``.
+        """
+        request = self.request
+        buckets = due_buckets()
+        bucket = request.GET.get('bucket')
+        tasks = Task.objects.assigned_work(request.user).exclude(
+            status=Task.TaskStatus.COMPLETED).select_related('project')
+        if bucket in buckets:
+            tasks = tasks.filter(buckets[bucket])
+        else:
+            bucket = ''
+        try:
+            page = paginate_keyset(
+                tasks, request.GET.get('cursor'), self.paginate_by,
+                self.keyset_ordering)
+        except InvalidCursor:
+            raise Http404('Cursor inválido')
+        return {
+            'summary': work_summary(request.user),
+            'bucket': bucket,
+            'tasks': page.object_list,
+            'page_obj': page,
+        }
+
 
 class SignUp(FormView):
     template_name = 'signup.html'
@@ -59,7 +107,7 @@ class Login(View):
 
     def post(self, request, *args, **kwargs):
         """POST method."""
-        form = self.form_class(request.POST, request.FILES)
+        form = self.form_class(request.POST, request.FILES, request=request)
         if form.is_valid():
             user = form.login()
             if user:
@@ -84,15 +132,16 @@ class LogoutView(View):
         return redirect('login')
 
 
-class ProjectListView(LoginRequiredMixin, ListView):
+class ProjectListView(LoginRequiredMixin, CachedPageMixin, ListView):
     model = Project
     template_name = 'projects.html'
     context_object_name = 'projects'
 
     def get_queryset(self):
-        return Project.objects.filter(
-            Q(owner=self.request.user)
-            | Q(tasks__assigned_to=self.request.user)).distinct()
+        return Project.objects.visible_to(self.request.user)
+
+    def get_cached_project_ids(self):
+        return self.get_queryset().values_list('pk', flat=True)
 
 
 class ProjectDetailView(LoginRequiredMixin, DetailView):
@@ -140,20 +189,49 @@ class ProjectDeleteView(LoginRequiredMixin, DeleteView):
             owner=self.request.user)
         return project
 
+    def form_valid(self, form):
+        # Only to the trash: purging the tasks is left to run_scheduler.
+        self.object.soft_delete()
+        messages.success(
+            self.request,
+            f"Proyecto «{self.object.name}» enviado a la papelera.")
+        return redirect(self.get_success_url())
+
+
+class ProjectTrashView(LoginRequiredMixin, ListView):
+    """The user's projects in the trash, which can still be restored."""
+
+    template_name = 'project_trash.html'
+    context_object_name = 'projects'
+
+    def get_queryset(self):
+        return Project.all_objects.restorable().filter(
+            owner=self.request.user).order_by('-deleted_at')
+
+
+class ProjectRestoreView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        project = get_object_or_404(
+            Project.all_objects.restorable(), pk=pk, owner=request.user)
+        project.restore()
+        messages.success(request, f"Proyecto «{project.name}» restaurado.")
+        return redirect('projects')
+
 
-class TaskListView(LoginRequiredMixin, ListView):
+class TaskListView(LoginRequiredMixin, CachedPageMixin,
+                   KeysetPaginationMixin, ListView):
     model = Task
     template_name = 'tasks.html'
     context_object_name = 'tasks'
+    paginate_by = 50
+    keyset_ordering = ('created_at', 'id')
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
 
-        qs = Task.objects.filter(
-            project_id=project_id).filter(
-            Q(project__owner=self.request.user)
-            | Q(assigned_to=self.request.user)
-        )
+        qs = Task.objects.visible_to(self.request.user).filter(
+            project_id=project_id
+        ).select_related('assigned_to', 'project__owner')
         status_filter = self.request.GET.get('status')
         if status_filter in [
             Task.TaskStatus.PENDING,
@@ -165,16 +243,15 @@ class TaskListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project = Project.objects.filter(
+        project = Project.objects.visible_to(self.request.user).filter(
             pk=self.kwargs['project_id']
-        ).filter(
-            Q(owner=self.request.user)
-            | Q(tasks__assigned_to=self.request.user)
-        ).distinct().first()
+        ).first()
         if not project:
             raise Http404("No tienes permiso para ver este proyecto")
         context['project'] = project
         context['selected_status'] = self.request.GET.get('status', "")
+        context['status_labels'] = dict(Task.TaskStatus.choices)
+        context.update(task_row_context(project, self.request.user))
         return context
 
 
@@ -184,12 +261,10 @@ class TaskDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'task'
 
     def get_object(self, queryset=None):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related(
+            'project', 'assigned_to')
         return get_object_or_404(
-            queryset.filter(
-                Q(project__owner=self.request.user) |
-                Q(assigned_to=self.request.user)
-            ),
+            queryset.visible_to(self.request.user),
             pk=self.kwargs['pk'],
             project__id=self.kwargs['project_id']
         )
@@ -200,11 +275,85 @@ class TaskDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
+# Labels of the fields in a task event diff.
+HISTORY_LABELS = {
+    'title': 'Título',
+    'status': 'Estado',
+    'due_date': 'Vencimiento',
+    'assigned_to_id': 'Asignado a',
+    'project_id': 'Proyecto',
+}
+
+
+def describe_events(events):
+    """Set ``event.changes`` to (label, old, new) display values.
+
+    Users and projects named in the diffs are loaded with one query each.
+    """
+    ids = {'assigned_to_id': set(), 'project_id': set()}
+    for event in events:
+        for field, values in event.diff.items():
+            if field in ids:
+                ids[field].update(value for value in values if value)
+    names = {
+        'assigned_to_id': dict(User.objects.filter(
+            pk__in=ids['assigned_to_id']).values_list('pk', 'username'))
+        if ids['assigned_to_id'] else {},
+        'project_id': dict(Project.objects.filter(
+            pk__in=ids['project_id']).values_list('pk', 'name'))
+        if ids['project_id'] else {},
+        'status': dict(Task.TaskStatus.choices),
+    }
+
+    def display(field, value):
+        if value is None:
+            return '—'
+        if field == 'due_date':
+            return datetime.date.fromisoformat(value).strftime('%d/%m/%Y')
+        return names.get(field, {}).get(value, value)
+
+    for event in events:
+        event.changes = [
+            (HISTORY_LABELS.get(field, field),
+             display(field, old), display(field, new))
+            for field, (old, new) in event.diff.items()
+        ]
+
+
+class TaskHistoryView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """Change log of a task, newest first."""
+
+    template_name = 'task_history.html'
+    context_object_name = 'events'
+    paginate_by = 50
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        self.task = get_object_or_404(
+            Task.objects.visible_to(self.request.user).select_related(
+                'project'),
+            pk=self.kwargs['pk'], project__id=self.kwargs['project_id'])
+        return TaskEvent.objects.filter(task=self.task).select_related(
+            'actor')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['task'] = self.task
+        context['project'] = self.task.project
+        describe_events(context['events'])
+        return context
+
+
 class TaskCreateView(LoginRequiredMixin, CreateView):
     model = Task
     form_class = TaskForm
     template_name = 'task_form.html'
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['project_id'] = self.kwargs['project_id']
+        return kwargs
+
     def form_valid(self, form):
         project = get_object_or_404(
             Project,
@@ -236,6 +385,11 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
         task = get_object_or_404(Task, pk=self.kwargs['pk'], project=project)
         return task
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['project_id'] = self.kwargs['project_id']
+        return kwargs
+
     def form_valid(self, form):
         return super().form_valid(form)
 
@@ -267,16 +421,114 @@ class TaskDeleteView(LoginRequiredMixin, DeleteView):
         return url_success
 
 
+class AssigneeSearchView(LoginRequiredMixin, View):
+    """Users matching ``?q=`` for the assignee picker of a project."""
+
+    limit = 10
+
+    def get(self, request, project_id):
+        project = get_object_or_404(
+            Project, pk=project_id, owner=request.user)
+        users = project.assignee_candidates(
+            request.GET.get('q', '').strip(), self.limit)
+        return JsonResponse({'results': [
+            {'id': user.pk, 'username': user.username} for user in users]})
+
+
+class SearchView(LoginRequiredMixin, View):
+    """Ranked search over the tasks or projects the user can see."""
+
+    template_name = 'search.html'
+    paginate_by = 20
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        kind = request.GET.get('type', 'tasks')
+        if kind == 'projects':
+            results = search_projects(query, request.user)
+        else:
+            kind = 'tasks'
+            results = search_tasks(query, request.user).select_related(
+                'project', 'assigned_to')
+        try:
+            page = paginate_keyset(
+                results, request.GET.get('cursor'), self.paginate_by,
+                SEARCH_ORDERING)
+        except InvalidCursor:
+            raise Http404('Cursor inválido')
+        return render(request, self.template_name, {
+            'query': query,
+            'type': kind,
+            'results': page.object_list,
+            'page_obj': page,
+        })
+
+
+class TaskExportView(LoginRequiredMixin, View):
+    """Stream the visible tasks as CSV or NDJSON (see webtask.export)."""
+
+    def get(self, request):
+        form = TaskExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        format = form.cleaned_data['format'] or 'csv'
+        tasks = filter_tasks(
+            Task.objects.visible_to(request.user), **form.filters())
+        response = StreamingHttpResponse(
+            export_chunks(tasks, format), content_type=CONTENT_TYPES[format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="tareas.{format}"')
+        return response
+
+
+class TaskImportView(LoginRequiredMixin, FormView):
+    """Import tasks into the user's own projects from an uploaded file."""
+
+    template_name = 'task_import.html'
+    form_class = TaskImportForm
+    max_errors_shown = 100
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        format = form.cleaned_data['format'] or guess_format(upload.name)
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            # All or nothing: a file that turns out unreadable halfway
+            # leaves no tasks behind.
+            with transaction.atomic():
+                result = import_tasks(
+                    read_rows(lines, format), owner=self.request.user)
+        except UnicodeDecodeError:
+            form.add_error('file', 'El archivo no está codificado en UTF-8.')
+            return self.form_invalid(form)
+        except csv.Error as exc:
+            form.add_error('file', f'CSV mal formado: {exc}')
+            return self.form_invalid(form)
+        if result.created:
+            messages.success(
+                self.request, f"{result.created} tarea(s) importada(s).")
+        return self.render_to_response(self.get_context_data(
+            form=TaskImportForm(), result=result,
+            errors=result.errors[:self.max_errors_shown]))
+
+
 class TaskChangeStatusView(LoginRequiredMixin, View):
     def get(self, request, project_id, pk, new_status):
-        task = get_object_or_404(Task, pk=pk, project__id=project_id)
-        if (request.user == task.project.owner or
-                request.user == task.assigned_to):
-            if new_status in [
-                Task.TaskStatus.PENDING,
-                Task.TaskStatus.IN_PROGRESS,
-                Task.TaskStatus.COMPLETED
-            ]:
-                task.status = new_status
-                task.save()
+        if new_status in Task.TaskStatus.values:
+            Task.objects.filter(project_id=project_id).change_status(
+                request.user, new_status, ids=[pk])
+        return redirect('tasks', project_id=project_id)
+
+
+class TaskBulkChangeStatusView(LoginRequiredMixin, View):
+    """Change the status of the tasks selected in the task list."""
+
+    def post(self, request, project_id):
+        new_status = request.POST.get('status')
+        ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+        if new_status in Task.TaskStatus.values and ids:
+            changed = Task.objects.filter(project_id=project_id).change_status(
+                request.user, new_status, ids=ids)
+            messages.success(
+                request, f"{len(changed)} tarea(s) actualizada(s).")
         return redirect('tasks', project_id=project_id)